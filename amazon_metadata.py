@@ -2,11 +2,12 @@
 # KIND Marketplace Normalizer (Fixed & Improved)
 ###############################################
 import json
-import re
 from collections import defaultdict, Counter
-from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from decimal import Decimal, InvalidOperation
 from typing import Any, Dict, List, Optional, Tuple
 
+from normalized import compute_unit_price, parse_pack_count
+
 # ---------------------------------------------------------
 # CONFIG
 # ---------------------------------------------------------
@@ -35,37 +36,20 @@ def to_decimal(x) -> Optional[Decimal]:
     except (InvalidOperation, ValueError, TypeError):
         return None
 
-_pack1 = re.compile(r"pack\s*(?:of)?\s*(\d+)", re.I)
-_pack2 = re.compile(r"(\d+)\s*(?:count|ct|pieces|pcs)\b", re.I)
-
-def parse_pack_count(v: dict) -> int:
-    if not isinstance(v, dict):
-        return 1
-    dims = v.get("variant_dimensions") or {}
-    for key in ("number_of_items", "number_of_items_string", "count", "items"):
-        val = dims.get(key)
-        if val:
-            cleaned = re.sub(r"\D", "", str(val))
-            if cleaned:
-                return max(1, int(cleaned))
-    for txt in (v.get("size"), v.get("title"), v.get("variant_name"), v.get("seller_name")):
-        if not txt:
-            continue
-        m = _pack1.search(txt) or _pack2.search(txt)
-        if m:
-            return max(1, int(m.group(1)))
-    return 1
-
-def compute_unit_price(price, pack: int) -> Optional[Decimal]:
-    p = to_decimal(price)
-    if p is None:
-        return None
-    if not isinstance(pack, int) or pack <= 0:
-        return None
-    try:
-        return (p / Decimal(pack)).quantize(Decimal("0.0001"), rounding=ROUND_HALF_UP)
-    except Exception:
-        return None
+def variant_unit_price(v: dict) -> Optional[Decimal]:
+    # precomputed by normalized.py; older normalized files get parsed here
+    if "canonical_unit_price" in v:
+        return to_decimal(v["canonical_unit_price"])
+    return compute_unit_price(v.get("price"), parse_pack_count(v))
+
+def offer_unit_price(s: dict) -> Optional[Decimal]:
+    """Declared unit price if positive, else price / pack count."""
+    if "effective_unit_price" in s:
+        return to_decimal(s["effective_unit_price"])
+    up_declared = to_decimal(s.get("unit_price"))
+    if up_declared and up_declared > 0:
+        return up_declared
+    return compute_unit_price(to_decimal(s.get("price")), parse_pack_count(s))
 
 def rating_tier(pos) -> Optional[str]:
     try:
@@ -83,10 +67,7 @@ def rating_tier(pos) -> Optional[str]:
 def choose_amazon_baseline(main_sellers: List[dict], variant_unit: Optional[Decimal]) -> Tuple[Optional[Decimal], str]:
     for m in main_sellers:
         if "amazon" in safe_lower(m.get("seller_name")):
-            up_decl = to_decimal(m.get("unit_price"))
-            if up_decl is not None and up_decl > 0:
-                return up_decl, "main_seller_amazon"
-            up = compute_unit_price(m.get("price"), parse_pack_count(m))
+            up = offer_unit_price(m)
             if up is not None:
                 return up, "main_seller_amazon"
             dp = to_decimal(m.get("price"))
@@ -95,12 +76,11 @@ def choose_amazon_baseline(main_sellers: List[dict], variant_unit: Optional[Deci
 
     if main_sellers:
         m = main_sellers[0]
-        up_decl = to_decimal(m.get("unit_price"))
-        if up_decl is not None and up_decl > 0:
-            return up_decl, "main_seller_first_unit"
-        up = compute_unit_price(m.get("price"), parse_pack_count(m))
+        up = offer_unit_price(m)
         if up is not None:
-            return up, "main_seller_first"
+            up_decl = to_decimal(m.get("unit_price"))
+            declared = up_decl is not None and up_decl > 0
+            return up, "main_seller_first_unit" if declared else "main_seller_first"
         dp = to_decimal(m.get("price"))
         if dp is not None:
             return dp, "main_seller_first_raw"
@@ -113,17 +93,10 @@ def choose_amazon_baseline(main_sellers: List[dict], variant_unit: Optional[Deci
 # ---------------------------------------------------------
 # MAIN NORMALIZER
 # ---------------------------------------------------------
-def generate_summary():
-    try:
-        with open(INPUT_FILE, "r", encoding="utf-8") as fh:
-            data = json.load(fh)
-    except Exception as e:
-        print("Error reading input file:", e)
-        data = []
-
-    total_products = len(data)
-    categories = {p.get("category") for p in data if p.get("category")}
-    total_categories = len(categories)
+def summarize(data) -> Dict[str, Any]:
+    """Summary dict for an iterable of product families (read once, in order)."""
+    total_products = 0
+    categories = set()
 
     total_skus = 0
     products_per_category = defaultdict(int)
@@ -157,6 +130,9 @@ def generate_summary():
     # MAIN LOOP
     # ---------------------------------------------------------
     for item in data:
+        total_products += 1
+        if item.get("category"):
+            categories.add(item.get("category"))
         category = item.get("category") or "Unknown"
         variants = item.get("variants") or []
         seller_market = item.get("seller_market") or []
@@ -190,8 +166,7 @@ def generate_summary():
             if not asin:
                 continue
 
-            pack = parse_pack_count(v)
-            variant_unit = compute_unit_price(v.get("price"), pack)
+            variant_unit = variant_unit_price(v)
 
             sellers = [s for s in seller_market if s.get("asin") == asin]
 
@@ -237,10 +212,7 @@ def generate_summary():
                 if tier:
                     rating_tier_counter[tier] += 1
 
-                sp = to_decimal(s.get("price"))
-                seller_pack = parse_pack_count(s)
-                up_declared = to_decimal(s.get("unit_price"))
-                seller_unit = up_declared if (up_declared and up_declared > 0) else compute_unit_price(sp, seller_pack)
+                seller_unit = offer_unit_price(s)
 
                 category_stats[category]["total"] += 1
                 if name not in EXCLUDED_SELLERS:
@@ -321,6 +293,7 @@ def generate_summary():
     # ---------------------------------------------------------
     # KPI AGGREGATION
     # ---------------------------------------------------------
+    total_categories = len(categories)
     skus_impacted = sum(1 for a, ss in sku_gouged_map.items() if ss)
     avg_pct = (sum(pct_deltas) / len(pct_deltas)) if pct_deltas else 0.0
     avg_abs = (sum(abs_deltas) / len(abs_deltas)) if abs_deltas else 0.0
@@ -407,17 +380,30 @@ def generate_summary():
             "abs_sample_count": len(abs_deltas),
         }
     }
+    return out
+
 
+def write_summary(out: Dict[str, Any], output_file: str = OUTPUT_FILE) -> None:
     try:
-        with open(OUTPUT_FILE, "w", encoding="utf-8") as fh:
+        with open(output_file, "w", encoding="utf-8") as fh:
             json.dump(out, fh, indent=4)
-        print("✔ Metadata generated successfully:", OUTPUT_FILE)
-        print("✔ Total products:", total_products)
-        print("✔ Total SKUs:", total_skus)
+        print("✔ Metadata generated successfully:", output_file)
+        print("✔ Total products:", out["total_products"])
+        print("✔ Total SKUs:", out["total_skus"])
     except Exception as e:
         print("Error writing output:", e)
 
 
+def generate_summary(input_file: str = INPUT_FILE, output_file: str = OUTPUT_FILE) -> None:
+    try:
+        with open(input_file, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+    except Exception as e:
+        print("Error reading input file:", e)
+        data = []
+
+    write_summary(summarize(data), output_file)
+
 
 if __name__ == "__main__":
     generate_summary()
@@ -1,44 +1,38 @@
+import argparse
 import os
-import json
+
+from merge_index import PARSE_WORKERS, incremental_merge, merge_order
+from stream_merge import STREAM_OUTPUT, stream_merge
 
 BASE_DIR = "all_products_3"
 OUTPUT_FILE = "all_products_merged.json"
 
 
-def normalize_json():
-    merged = {}
-
-    # Traverse each category folder
-    for category in os.listdir(BASE_DIR):
-        path = os.path.join(BASE_DIR, category, "results.json")
-        if not os.path.exists(path):
-            continue
-
-        print(f"Processing: {path}")
-
-        with open(path, "r", encoding="utf-8") as f:
-            variants = json.load(f)
-
-        for item in variants:
-            asin = item.get("asin")
-            if not asin:
-                continue
-
-            # Add category to the item
-            item["category"] = category
+def normalize_json(full=False, stream=False, workers=PARSE_WORKERS):
+    # Only re-parse categories whose results.json changed since the last run
+    # (see merge_index.py), in a process pool. The first entry of each ASIN
+    # is kept, with All_Snacks last like dupicate.py.
+    category_order = merge_order(BASE_DIR)
+    if stream:
+        # bounded memory: NDJSON out, only the ASIN-seen set kept
+        stream_merge(BASE_DIR, category_order, STREAM_OUTPUT)
+        return
 
-            # Only store first entry of this ASIN
-            if asin not in merged:
-                merged[asin] = item
+    stats = incremental_merge(BASE_DIR, category_order, OUTPUT_FILE, full=full, workers=workers)
 
-    # Save merged JSON
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as out:
-        json.dump(list(merged.values()), out, indent=2, ensure_ascii=False)
+    for category in stats["reparsed"]:
+        print(f"Processing: {os.path.join(BASE_DIR, category, 'results.json')}")
 
     print("\n🎉 Finished Normalizing with Category!")
-    print("Unique ASINs:", len(merged))
+    print("Unique ASINs:", stats["items"])
     print("Output:", OUTPUT_FILE)
 
 
 if __name__ == "__main__":
-    normalize_json()
+    parser = argparse.ArgumentParser(description="Merge all_products_3 into one ASIN list")
+    parser.add_argument("--full", action="store_true", help="ignore the merge index and re-parse everything")
+    parser.add_argument("--stream", action="store_true",
+                        help=f"stream items into {STREAM_OUTPUT} instead (flat memory)")
+    parser.add_argument("--workers", type=int, default=PARSE_WORKERS, help="parser processes (1 = serial)")
+    args = parser.parse_args()
+    normalize_json(full=args.full, stream=args.stream, workers=args.workers)
@@ -0,0 +1,170 @@
+###############################################
+# normalized.normalize benchmark (synthetic catalog)
+###############################################
+# Blows all_products_merged.json up to N other_sellers offers (new ASINs,
+# jittered prices, offers drawn from a pool of sellers so strings repeat
+# the way they do in real crawls) and times normalize_items with a cold
+# and a warm parse cache, then the sharded path at several worker counts.
+# --check-incremental edits the real catalog step by step and checks that
+# normalize_index.py's spliced output matches a full normalize each time.
+#
+#   python bench_normalize.py                   # 1M offers
+#   python bench_normalize.py --offers 200000 --workers 1 2 4 8
+#   python bench_normalize.py --check-incremental
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from normalize_index import incremental_normalize
+from normalized import (
+    INPUT_FILE,
+    dump_families,
+    normalize_items,
+    normalize_sharded,
+    parse_money,
+    parse_rating_meta,
+    parse_rating_stars,
+    parse_unit_price,
+)
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+OFFERS = 1_000_000
+WORKERS = (1, 2, 4, 8)
+SELLERS = 5000
+SEED = 0
+
+
+def synthetic_items(n_offers, input_file=INPUT_FILE, seed=SEED):
+    with open(input_file, "r", encoding="utf-8") as f:
+        templates = [p for p in json.load(f) if p.get("other_sellers")]
+    rng = random.Random(seed)
+    # the same third-party sellers show up across many listings
+    pool = [
+        {
+            "sold_by": f"Seller {k}",
+            "ships_from": f"Seller {k}",
+            "seller_rating": f"Seller rating is {rng.choice(['3', '3.5', '4', '4.5', '5'])} out of 5 stars",
+            "seller_rating_count": f"({rng.randint(1, 20000):,} ratings) {rng.randint(10, 100)}% positive over last 12 months",
+        }
+        for k in range(SELLERS)
+    ]
+    items = []
+    offers = 0
+    i = 0
+    while offers < n_offers:
+        t = templates[i % len(templates)]
+        sellers = []
+        for osel in t["other_sellers"]:
+            cents = rng.randint(300, 6000)
+            sellers.append(dict(
+                osel,
+                price=f"${cents // 100}.{cents % 100:02d}",
+                price_per_unit=f"( ${cents / 1200:.2f} ${cents / 1200:.2f} / count)",
+                **rng.choice(pool),
+            ))
+        items.append(dict(t, asin=f"B{i:09d}", other_sellers=sellers,
+                          source_product_url=f"{t['source_product_url']}?v={i % 5000}"))
+        offers += len(sellers)
+        i += 1
+    return items, offers
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - start
+
+
+def run(n_offers=OFFERS, workers=WORKERS):
+    items, offers = synthetic_items(n_offers)
+    print(f"🧪 {len(items)} items, {offers} offers, {os.cpu_count()} cores")
+
+    parsers = (parse_money, parse_unit_price, parse_rating_stars, parse_rating_meta)
+    for fn in parsers:
+        fn.cache_clear()
+    cold, t_cold = timed(normalize_items, items)
+    print(f"   cold cache {t_cold:>7.2f}s")
+    warm, t_warm = timed(normalize_items, items)
+    print(f"   warm cache {t_warm:>7.2f}s")
+    hits = sum(fn.cache_info().hits for fn in parsers)
+    misses = sum(fn.cache_info().misses for fn in parsers)
+    print(f"   parse cache hit rate {hits / max(1, hits + misses):.1%}, identical output: {cold == warm}")
+    report = {"items": len(items), "offers": offers, "cores": os.cpu_count(),
+              "cold_s": round(t_cold, 2), "warm_s": round(t_warm, 2),
+              "identical": cold == warm, "sharded": []}
+
+    # normalize + serialize, as normalize() does: serial json.dumps vs
+    # shards serialized in their workers; the bytes must match
+    expected, t_serial = timed(lambda: json.dumps(normalize_items(items), indent=2))
+    print(f"\n   {'workers':>7} {'seconds':>8} {'speedup':>8} {'identical':>9}")
+    print(f"   {'serial':>7} {t_serial:>8.2f} {1:>7.2f}x {'-':>9}")
+    for w in workers:
+        out, t = timed(lambda: dump_families(normalize_sharded(items, w, as_json=True)))
+        identical = out == expected
+        print(f"   {w:>7} {t:>8.2f} {t_serial / t:>7.2f}x {str(identical):>9}")
+        report["sharded"].append({"workers": w, "seconds": round(t, 2), "identical": identical})
+    report["serial_s"] = round(t_serial, 2)
+    return report
+
+
+def _edits(items):
+    """(label, edit) pairs applied in sequence to a copy of the catalog."""
+    def price(xs):
+        xs[len(xs) // 2]["price"] = "$99.99"
+
+    def offers(xs):
+        p = next(p for p in xs if len(p.get("other_sellers") or []) > 1)
+        p["other_sellers"] = p["other_sellers"][:1]
+
+    def delivery_only(xs):
+        for o in xs[1].get("other_sellers") or []:
+            o["delivery"] = "tomorrow"
+
+    def remove(xs):
+        del xs[len(xs) // 3]
+
+    def add(xs):
+        xs.append(dict(xs[0], asin="BCHECK0001", source_product_url="https://example.com/products/check"))
+
+    def move(xs):
+        # same items, but another family now appears first
+        xs.insert(0, xs.pop())
+
+    return [("price", price), ("offers", offers), ("delivery only", delivery_only),
+            ("remove", remove), ("add", add), ("move", move)]
+
+
+def check_incremental(input_file=INPUT_FILE):
+    with open(input_file, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    ok = True
+    with tempfile.TemporaryDirectory(prefix="kind_norm_check_") as root:
+        out = os.path.join(root, "normalized.json")
+        incremental_normalize(items, out)
+        for label, edit in _edits(items):
+            edit(items)
+            stats = incremental_normalize(items, out)
+            with open(out, "r") as f:
+                same = f.read() == json.dumps(normalize_items(items), indent=2)
+            ok &= same
+            print(f"   {label:<14} {stats['renormalized']:>3} re-normalized  identical: {same}")
+    print("✔ incremental == full" if ok else "❌ incremental output differs from a full normalize")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark normalized.normalize_items")
+    parser.add_argument("--offers", type=int, default=OFFERS)
+    parser.add_argument("--workers", type=int, nargs="+", default=list(WORKERS))
+    parser.add_argument("--check-incremental", action="store_true",
+                        help="check normalize_index.py against full normalizes on edited copies of the catalog")
+    args = parser.parse_args()
+    if args.check_incremental:
+        sys.exit(0 if check_incremental() else 1)
+    run(args.offers, args.workers)
@@ -0,0 +1,169 @@
+###############################################
+# Scraper throughput benchmark (local stand-in)
+###############################################
+# Serves synthetic product pages from standin_server and runs
+# cat.crawl_all over them at several concurrency levels.
+#
+#   python bench_scraper.py                          # default levels
+#   python bench_scraper.py --levels 1 4 8 --products 40 --delay-ms 300
+#   python bench_scraper.py --adaptive               # with cat.py's AIMD limiter on
+#   python bench_scraper.py --compare bench_results/a.json bench_results/b.json
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+from standin_server import StandinServer, make_product
+from waits import StepLatency
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+LEVELS = (1, 2, 4, 8)
+PRODUCTS = 24
+DELAY_MS = 250
+RESULTS_DIR = "bench_results"
+CATEGORY = "Bench"
+
+
+def synthetic_catalog(n):
+    """Mix of the cases the scraper meets: payload hit, hit at a later ZIP,
+    no-XHR widget (click path), and products not on Amazon."""
+    kinds = [
+        dict(amazon_zip=""),
+        dict(amazon_zip="10001"),
+        dict(amazon_zip="", inline=True),
+        dict(amazon_zip=None),
+    ]
+    return [
+        make_product(f"bench-product-{i:03d}", f"B0BENCH{i:03d}", **kinds[i % len(kinds)])
+        for i in range(n)
+    ]
+
+
+def _git_rev():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+async def run_level(srv, concurrency, workdir, block_resources=True, adaptive=False):
+    from cat import crawl_all
+
+    level_dir = os.path.join(workdir, f"c{concurrency}")
+    links_dir = os.path.join(level_dir, "links")
+    os.makedirs(os.path.join(links_dir, CATEGORY), exist_ok=True)
+    with open(os.path.join(links_dir, CATEGORY, "links.json"), "w", encoding="utf-8") as f:
+        json.dump(srv.product_urls(), f)
+
+    stats = StepLatency()
+    start = time.perf_counter()
+    results = await crawl_all(
+        base_dir=links_dir,
+        output_dir=os.path.join(level_dir, "out"),
+        concurrency=concurrency,
+        max_in_flight=max(concurrency, 1) * 2,
+        zip_cache_file=os.path.join(level_dir, "zip_stats.json"),
+        journal_file=os.path.join(level_dir, "journal.jsonl"),
+        block_resources=block_resources,
+        headless=True,
+        stats=stats,
+        change_detection=False,
+        # the AIMD limiter would cap every level near its initial limit
+        adaptive=adaptive,
+        browser_args=srv.browser_args,
+    )
+    elapsed = time.perf_counter() - start
+
+    steps = stats.summary()
+    product = steps.pop("product", {})
+    n = sum(len(v) for v in results.values())
+    found = sum(1 for v in results.values() for r in v.values() if r.get("amazon"))
+    return {
+        "concurrency": concurrency,
+        "products": n,
+        "amazon_found": found,
+        "seconds": round(elapsed, 2),
+        "products_per_min": round(n / elapsed * 60, 1) if elapsed else None,
+        "p50_ms": product.get("p50_ms"),
+        "p95_ms": product.get("p95_ms"),
+        "steps": {
+            step: {k: s[k] for k in ("count", "timeouts", "p50_ms", "p95_ms")}
+            for step, s in steps.items()
+        },
+    }
+
+
+async def run_bench(levels=LEVELS, products=PRODUCTS, delay_ms=DELAY_MS, block_resources=True, adaptive=False):
+    runs = []
+    with StandinServer(catalog=synthetic_catalog(products), port=0, delay_ms=delay_ms) as srv:
+        with tempfile.TemporaryDirectory(prefix="kind_bench_") as workdir:
+            for c in levels:
+                print(f"\n🏁 concurrency={c}")
+                runs.append(await run_level(srv, c, workdir, block_resources, adaptive))
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_rev": _git_rev(),
+        "products": products,
+        "delay_ms": delay_ms,
+        "block_resources": block_resources,
+        "adaptive": adaptive,
+        "runs": runs,
+    }
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print_report(report)
+    print("💾 Saved:", path)
+    return report
+
+
+def print_report(report):
+    print(f"\n📊 {report['products']} products, widget delay {report['delay_ms']} ms, rev {report['git_rev']}")
+    print(f"   {'conc':>4} {'prod/min':>9} {'p50 ms':>8} {'p95 ms':>8} {'found':>6}")
+    for r in report["runs"]:
+        print(
+            f"   {r['concurrency']:>4} {r['products_per_min'] or 0:>9.1f} "
+            f"{r['p50_ms'] or 0:>8.0f} {r['p95_ms'] or 0:>8.0f} {r['amazon_found']:>6}"
+        )
+
+
+def compare(old_path, new_path):
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = {r["concurrency"]: r for r in json.load(f)["runs"]}
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = {r["concurrency"]: r for r in json.load(f)["runs"]}
+
+    print(f"   {'conc':>4} {'prod/min old→new':>22} {'p95 ms old→new':>20}")
+    for c in sorted(set(old) & set(new)):
+        a, b = old[c], new[c]
+        change = ((b["products_per_min"] / a["products_per_min"]) - 1) * 100 if a["products_per_min"] else 0
+        print(
+            f"   {c:>4} {a['products_per_min']:>8.1f} → {b['products_per_min']:<8.1f}({change:+.0f}%) "
+            f"{a['p95_ms'] or 0:>8.0f} → {b['p95_ms'] or 0:<8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cat.py against a local stand-in")
+    parser.add_argument("--levels", type=int, nargs="+", default=list(LEVELS))
+    parser.add_argument("--products", type=int, default=PRODUCTS)
+    parser.add_argument("--delay-ms", type=int, default=DELAY_MS)
+    parser.add_argument("--no-block", action="store_true")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="keep cat.py's per-host AIMD limiter on (off: measure raw concurrency)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        asyncio.run(run_bench(args.levels, args.products, args.delay_ms, not args.no_block, args.adaptive))
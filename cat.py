@@ -1,122 +1,337 @@
+import argparse
+import asyncio
 import json
+import os
 import time
-from playwright.sync_api import sync_playwright
+from collections import defaultdict
+from playwright.async_api import async_playwright
+
+from waits import (
+    LATENCY,
+    capture_popup_url,
+    is_wtb_response,
+    seller_signature,
+    wait_nearby_tab,
+    wait_online_tab,
+    wait_page_ready,
+    wait_seller_list,
+    wait_widget_open,
+)
+from crawl_journal import (
+    DONE,
+    FAILED,
+    FAILED_DIR,
+    JOURNAL_FILE,
+    MAX_ATTEMPTS,
+    PENDING,
+    CrawlJournal,
+    backoff_delay,
+    classify,
+    load_failed_missing,
+)
+from host_limiter import AIMDController, RequestSignals
+from page_fingerprint import FINGERPRINT_FILE, REFRESH_TTL_DAYS, PageFingerprints
+from request_router import RequestRouter, summarize as summarize_routes
+from snapshots import SNAPSHOT_DIR, SnapshotRecorder, SnapshotStore, popup_link
+from span_trace import (
+    M_NEARBY,
+    M_ONLINE,
+    M_PAYLOAD,
+    M_SELLER_ID,
+    NULL_TRACE,
+    TRACE_FILE,
+    Tracer,
+)
+from work_queue import QUEUE_DB, WorkQueue
+from wtb_capture import ZIP_PAYLOAD_TIMEOUT_MS, WtbCapture
+from zip_cache import CACHE_FILE, ZIP_CODES, ZipCache
 
 HEADLESS = False
 
+# === Batch crawl config ===
+LINKS_DIR = "kind_products_final"
+OUTPUT_DIR = "kind_products_final"
+CONCURRENCY = 4          # parallel browser contexts
+PAGES_PER_CONTEXT = 1    # worker pages opened inside each context
+MAX_IN_FLIGHT = 8        # products extracting / queued at once
+PAGE_REUSE = 25          # products handled by one page before it is recycled
+
+# Read the Amazon link from the widget's retailer XHR instead of clicking
+# through tabs/popups; the click path still runs when no payload shows up.
+NETWORK_CAPTURE = True
+
+# When the first SERIAL_ZIPS learned ZIPs miss, probe the rest on
+# RACE_WIDTH extra pages at once (0/1 = keep the serial loop).
+RACE_WIDTH = 0
+SERIAL_ZIPS = 1
+
+# Abort images/media/fonts/trackers on product pages (WTB widget allowed).
+BLOCK_RESOURCES = True
+
+# Idle workers re-check the shared queue this often (s) while other
+# workers still hold leases.
+QUEUE_POLL_SECONDS = 10
+
+# Let an AIMD controller pick the in-flight pages per host (up to the
+# concurrency x pages_per_context workers) instead of running all of them.
+# Off by default until the per-request signal has been tuned on live runs.
+ADAPTIVE_CONCURRENCY = False
+
+# Skip the widget for pages whose title / image / widget config hash is
+# unchanged since a crawl that found Amazon (re-crawled after the TTL).
+CHANGE_DETECTION = True
+
+# === Selectors (shared by the live scraper and snapshot replay) ===
+SEL_TITLE = "h1.pdp-hero__product-name"
+SEL_IMAGE = "img.pdp-hero-slide__image"
+SEL_AMAZON_BLOCK = 'div.ps-online-seller-details-wrapper[data-retailer="Amazon.com"]'
+SEL_BUY_BUTTON = "button.ps-online-buy-button"
+SEL_AMAZON_SELLER_BTN = 'li[data-seller="2"] button.ps-online-buy-button'
+
+
+async def open_widget(page, product_url, stats=None, trace=NULL_TRACE):
+    """Load a product page and open its WTB widget. Returns (title, image)."""
+    with trace.span("goto"):
+        await page.goto(product_url, timeout=60000, wait_until="domcontentloaded")
+    with trace.span("page_ready"):
+        await wait_page_ready(page, stats)
+
+    title_elem = await page.query_selector(SEL_TITLE)
+    title = (await title_elem.inner_text()).strip() if title_elem else None
+
+    img_elem = await page.query_selector(SEL_IMAGE)
+    img_url = await img_elem.get_attribute("src") if img_elem else None
+
+    # === Open WTB widget ===
+    with trace.span("widget_open"):
+        wtb_btn = await page.wait_for_selector(".ps-widget", timeout=10000)
+        await wtb_btn.click(force=True)
+        await wait_widget_open(page, stats)
+
+    return title, img_url
+
 
-def extract_amazon(page, product_url):
+async def probe_zip(page, zipcode, capture=None, stats=None, trace=NULL_TRACE):
+    """Search one ZIP in the open widget. Returns the Amazon link or None."""
+    print(f"\n📌 ZIP Try → {zipcode}")
 
+    # CLICK nearby tab every loop
     try:
-        page.goto(product_url, timeout=60000)
-        page.wait_for_load_state("load")
-        time.sleep(2)
-
-        title_elem = page.query_selector("h1.pdp-hero__product-name")
-        title = title_elem.inner_text().strip() if title_elem else None
-
-        img_elem = page.query_selector("img.pdp-hero-slide__image")
-        img_url = img_elem.get_attribute("src") if img_elem else None
-
-        # === Open WTB widget ===
-        wtb_btn = page.wait_for_selector(".ps-widget", timeout=10000)
-        wtb_btn.click(force=True)
-        time.sleep(2)
-
-        # === ZIP CODES to test (All regions) ===
-        ZIP_CODES = [
-            "60601", "48201",
-            "10001", "02139",
-            "75201", "33101",
-            "90001", "98101",
-            "80202", "84101"
-        ]
+        with trace.span("nearby_tab", zip=zipcode):
+            nearby_tab = await page.query_selector("h2.ps-local-heading")
+            if nearby_tab:
+                await nearby_tab.click(force=True)
+                await wait_nearby_tab(page, stats)
+    except:
+        pass
 
-        amazon_link = None
+    with trace.span("zip_search", zip=zipcode):
+        # Fill ZIP
+        loc_input = await page.query_selector("input.ps-map-location-textbox")
+        if loc_input:
+            await loc_input.fill(zipcode)
 
-        for zipcode in ZIP_CODES:
-            print(f"\n📌 ZIP Try → {zipcode}")
+        search_btn = await page.query_selector("span.ps-map-location-button")
+        if search_btn:
+            before = await seller_signature(page)
+            await wait_seller_list(page, before, lambda: search_btn.click(force=True), stats)
 
-            # CLICK nearby tab every loop
+    if capture:
+        with trace.span("zip_payload", zip=zipcode):
+            found = await capture.wait(ZIP_PAYLOAD_TIMEOUT_MS)
+        if found:
+            print(f"🛰  Found Amazon in widget payload @ ZIP {zipcode}")
+            trace.hit(M_PAYLOAD, zipcode)
+            return capture.amazon_link
+
+    # === Method #1: Original Nearby Retailer selector ===
+    amazon_block = await page.query_selector(SEL_AMAZON_BLOCK)
+    if amazon_block:
+        buy_btn = await amazon_block.query_selector(SEL_BUY_BUTTON)
+        if buy_btn:
+            print("👉 Found Amazon in Nearby tab")
             try:
-                nearby_tab = page.query_selector("h2.ps-local-heading")
-                if nearby_tab:
-                    nearby_tab.click(force=True)
-                    time.sleep(1)
+                with trace.span("popup", zip=zipcode, via=M_NEARBY):
+                    amazon_link = await capture_popup_url(page, buy_btn, stats)
+                print(f"🎯 SUCCESS @ ZIP {zipcode}")
+                trace.hit(M_NEARBY, zipcode)
+                return amazon_link
             except:
                 pass
 
-            # Fill ZIP
-            loc_input = page.query_selector("input.ps-map-location-textbox")
-            if loc_input:
-                loc_input.fill(zipcode)
-                time.sleep(1)
+    # === Method #2: Find Online tab → retailer Amazon.com ===
+    try:
+        with trace.span("online_tab", zip=zipcode):
+            online_tab = await page.query_selector('[data-item="onlineSellers"]')
+            if online_tab:
+                await online_tab.click(force=True)
+                await wait_online_tab(page, stats)
+    except:
+        pass
 
-            search_btn = page.query_selector("span.ps-map-location-button")
-            if search_btn:
-                search_btn.click(force=True)
-                time.sleep(3)
+    amazon_online_block = await page.query_selector(f"{SEL_AMAZON_BLOCK} {SEL_BUY_BUTTON}")
+    if amazon_online_block:
+        print("👉 Found Amazon in Find Online tab (Retailer Name)")
+        try:
+            with trace.span("popup", zip=zipcode, via=M_ONLINE):
+                amazon_link = await capture_popup_url(page, amazon_online_block, stats)
+            print(f"🎯 SUCCESS in Online Tab @ ZIP {zipcode}")
+            trace.hit(M_ONLINE, zipcode)
+            return amazon_link
+        except:
+            pass
 
-            # === Method #1: Original Nearby Retailer selector ===
-            amazon_block = page.query_selector(
-                'div.ps-online-seller-details-wrapper[data-retailer="Amazon.com"]'
-            )
-            if amazon_block:
-                buy_btn = amazon_block.query_selector("button.ps-online-buy-button")
-                if buy_btn:
-                    print("👉 Found Amazon in Nearby tab")
-                    try:
-                        with page.expect_popup() as popup_info:
-                            buy_btn.click(force=True)
-                        popup = popup_info.value
-                        amazon_link = popup.url
-                        popup.close()
-                        print(f"🎯 SUCCESS @ ZIP {zipcode}")
-                        break
-                    except:
-                        pass
-
-            # === Method #2: Find Online tab → retailer Amazon.com ===
-            try:
-                online_tab = page.query_selector('[data-item="onlineSellers"]')
-                if online_tab:
-                    online_tab.click(force=True)
-                    time.sleep(2)
-            except:
-                pass
+    # === Method #3: Find Online → data-seller="2" ===
+    amazon_seller_btn = await page.query_selector(SEL_AMAZON_SELLER_BTN)
+    if amazon_seller_btn:
+        print("👉 Found Amazon using Seller ID=2")
+        try:
+            with trace.span("popup", zip=zipcode, via=M_SELLER_ID):
+                amazon_link = await capture_popup_url(page, amazon_seller_btn, stats)
+            print(f"🎯 SUCCESS via Seller #2 @ ZIP {zipcode}")
+            trace.hit(M_SELLER_ID, zipcode)
+            return amazon_link
+        except:
+            pass
 
-            amazon_online_block = page.query_selector(
-                'div.ps-online-seller-details-wrapper[data-retailer="Amazon.com"] button.ps-online-buy-button'
-            )
-            if amazon_online_block:
-                print("👉 Found Amazon in Find Online tab (Retailer Name)")
-                try:
-                    with page.expect_popup() as popup_info:
-                        amazon_online_block.click(force=True)
-                    popup = popup_info.value
-                    amazon_link = popup.url
-                    popup.close()
-                    print(f"🎯 SUCCESS in Online Tab @ ZIP {zipcode}")
-                    break
-                except:
-                    pass
+    return None
 
-            # === Method #3: Find Online → data-seller="2" ===
-            amazon_seller_btn = page.query_selector(
-                'li[data-seller="2"] button.ps-online-buy-button'
-            )
-            if amazon_seller_btn:
-                print("👉 Found Amazon using Seller ID=2")
-                try:
-                    with page.expect_popup() as popup_info:
-                        amazon_seller_btn.click(force=True)
-                    popup = popup_info.value
-                    amazon_link = popup.url
-                    popup.close()
-                    print(f"🎯 SUCCESS via Seller #2 @ ZIP {zipcode}")
-                    break
-                except:
-                    pass
+
+async def race_zips(
+    context,
+    product_url,
+    zip_codes,
+    width=RACE_WIDTH,
+    network_capture=NETWORK_CAPTURE,
+    stats=None,
+    router=None,
+    trace=NULL_TRACE,
+    signals=None,
+):
+    """
+    Probe `zip_codes` on `width` extra pages of the same context, each
+    pulling the next ZIP off a shared list. The first Amazon link wins and
+    the other probes are cancelled.
+
+    Returns (winning_zip, amazon_link, missed_zips).
+    """
+    pending = list(zip_codes)
+    missed = []
+    winner = asyncio.get_running_loop().create_future()
+
+    async def racer():
+        page = await context.new_page()
+        if router:
+            await router.install(page)
+        if signals:
+            signals.attach(page)
+        capture = WtbCapture(page) if network_capture else None
+        try:
+            await open_widget(page, product_url, stats, trace)
+            while pending and not winner.done():
+                zipcode = pending.pop(0)
+                link = await probe_zip(page, zipcode, capture, stats, trace)
+                if link:
+                    if not winner.done():
+                        winner.set_result((zipcode, link))
+                else:
+                    missed.append(zipcode)
+        except Exception as e:
+            print(f"⚠ ZIP racer failed: {e}")
+        finally:
+            if capture:
+                capture.detach()
+            await page.close()
+
+    racers = [asyncio.create_task(racer()) for _ in range(min(width, len(pending)))]
+    all_done = asyncio.ensure_future(asyncio.gather(*racers))
+    await asyncio.wait({winner, all_done}, return_when=asyncio.FIRST_COMPLETED)
+
+    for task in racers:
+        if not task.done():
+            task.cancel()
+    await asyncio.gather(all_done, return_exceptions=True)
+
+    if winner.done():
+        zipcode, link = winner.result()
+        print(f"🏁 ZIP race won @ {zipcode}")
+        return zipcode, link, missed
+    winner.cancel()
+    return None, None, missed
+
+
+async def extract_amazon(
+    page,
+    product_url,
+    stats=None,
+    network_capture=NETWORK_CAPTURE,
+    zip_cache=None,
+    category=None,
+    race_width=RACE_WIDTH,
+    router=None,
+    tracer=None,
+    signals=None,
+):
+
+    capture = WtbCapture(page) if network_capture else None
+    trace = tracer.product(product_url, category) if tracer else NULL_TRACE
+    amazon_link = None
+    if router:
+        router.reset()
+
+    try:
+        title, img_url = await open_widget(page, product_url, stats, trace)
+
+        # === Method #0: Amazon entry straight from the widget payload ===
+        if capture:
+            with trace.span("payload"):
+                amazon_link = await capture.wait()
+            if amazon_link:
+                print("🛰  Found Amazon in widget payload")
+                trace.hit(M_PAYLOAD)
+                return {
+                    "title": title,
+                    "image": img_url,
+                    "amazon": amazon_link
+                }
+
+        # === ZIP CODES to test, best historical hit rate first ===
+        zip_codes = zip_cache.order(category, product_url) if zip_cache else ZIP_CODES
+        racing = race_width > 1 and len(zip_codes) > SERIAL_ZIPS
+        serial = zip_codes[:SERIAL_ZIPS] if racing else zip_codes
+
+        amazon_link = None
+        hit_zip = None
+        missed = []
+
+        for zipcode in serial:
+            amazon_link = await probe_zip(page, zipcode, capture, stats, trace)
+            if amazon_link:
+                hit_zip = zipcode
+                break
+            missed.append(zipcode)
+
+        # === Learned order missed → race the rest across pages ===
+        if not amazon_link and racing:
+            with trace.span("zip_race", width=race_width):
+                hit_zip, amazon_link, race_missed = await race_zips(
+                    page.context,
+                    product_url,
+                    zip_codes[SERIAL_ZIPS:],
+                    width=race_width,
+                    network_capture=network_capture,
+                    stats=stats,
+                    router=router,
+                    trace=trace,
+                    signals=signals,
+                )
+            missed.extend(race_missed)
+
+        if zip_cache:
+            for zipcode in missed:
+                zip_cache.record(category, product_url, zipcode, False)
+            if hit_zip:
+                zip_cache.record(category, product_url, hit_zip, True)
 
         return {
             "title": title,
@@ -126,19 +341,483 @@ def extract_amazon(page, product_url):
 
     except Exception as e:
         print(f"⚠ Extract failed: {e}")
+        amazon_link = None
         return {"title": None, "image": None, "amazon": None}
 
+    finally:
+        trace.finish(bool(amazon_link))
+        if capture:
+            capture.detach()
+        if zip_cache:
+            zip_cache.finish_product(product_url)
+        if router:
+            report = await router.finish(page, product_url)
+            print(
+                f"🧹 blocked {report['requests_blocked']} requests "
+                f"(~{report['bytes_saved_est'] // 1024} KB est., "
+                f"{report['bytes_saved_measured'] // 1024} KB measured), "
+                f"page load {report['page_load_ms']} ms"
+            )
+
+
+def load_links(base_dir=LINKS_DIR):
+    """Return {category: [product_url, ...]} from <base_dir>/<Category>/links.json."""
+    links = {}
+    for category in sorted(os.listdir(base_dir)):
+        path = os.path.join(base_dir, category, "links.json")
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            links[category] = json.load(f)
+    return links
+
+
+def load_results(output_dir, category):
+    """{product_url: amazon_link} from an existing <Category>/results.json."""
+    path = os.path.join(output_dir, category, "results.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return {row["product_url"]: row.get("amazon_link") for row in json.load(f)}
+
+
+def url_categories(links):
+    """{product_url: category} from links.json (first category wins)."""
+    home = {}
+    for category, urls in links.items():
+        for url in urls:
+            home.setdefault(url, category)
+    return home
+
+
+def _has_link(result):
+    if isinstance(result, dict):
+        return bool(result.get("amazon"))
+    return bool(result)
+
+
+def plan_jobs(links, journal, resume=False, retry_only=False, failed_dir=FAILED_DIR, max_attempts=MAX_ATTEMPTS):
+    """
+    Pick (category, url) jobs for a run:
+      default     every URL in links.json
+      resume      skip URLs already done/missing in the journal's current run
+      retry_only  only journal failed/missing URLs + failed.json/missing.json,
+                  under max_attempts in the current run
+    """
+    if retry_only:
+        home = url_categories(links)
+        wanted = {}
+        for source in (journal.retry_candidates(), load_failed_missing(failed_dir)):
+            for category, urls in source.items():
+                for url in urls:
+                    if journal.state(url) != DONE and journal.attempts(url) < max_attempts:
+                        wanted.setdefault(url, home.get(url) or journal.category(url) or category)
+        return [(category, url) for url, category in wanted.items()]
 
-def test_single_product():
+    jobs = []
+    for category, urls in links.items():
+        for url in urls:
+            if resume and journal.is_completed(url):
+                continue
+            jobs.append((category, url))
+    return jobs
+
+
+def write_results(output_dir, category, rows):
+    os.makedirs(os.path.join(output_dir, category), exist_ok=True)
+    path = os.path.join(output_dir, category, "results.json")
+    # tmp + rename: queue workers on other hosts may write the same file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(rows, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+    return path
+
+
+def save_all_results(output_dir, links, results, journal=None):
+    """
+    Write <Category>/results.json in links.json order. Each URL keeps the
+    freshest result that has an Amazon link: this run's, then the journal's
+    for this run, then the previous results.json, then an older journal
+    entry. Without any link the freshest result is written as is. Results
+    filed under another category than links.json's go to the links.json one.
+    """
+    home = url_categories(links)
+    regrouped = {}
+    for category, rows in results.items():
+        for url, result in rows.items():
+            regrouped.setdefault(home.get(url, category), {})[url] = result
+
+    for category in sorted(set(links) | set(regrouped)):
+        previous = load_results(output_dir, category)
+        crawled = regrouped.get(category, {})
+        order = list(links.get(category, []))
+        order += [u for u in list(previous) + list(crawled) if u not in order]
+
+        rows = []
+        for url in order:
+            candidates = [
+                crawled.get(url),
+                journal.result(url, current_run=True) if journal else None,
+                previous.get(url),
+                journal.result(url) if journal else None,
+            ]
+            known = [c for c in candidates if c is not None]
+            if not known and url not in crawled and url not in previous:
+                continue
+            amazon_link = next((c for c in known if _has_link(c)), known[0] if known else None)
+            rows.append({"product_url": url, "amazon_link": amazon_link})
+
+        if not rows:
+            continue
+        path = write_results(output_dir, category, rows)
+        print(f"💾 Saved {len(rows)} → {path}")
+
+
+async def crawl_all(
+    base_dir=LINKS_DIR,
+    output_dir=OUTPUT_DIR,
+    concurrency=CONCURRENCY,
+    pages_per_context=PAGES_PER_CONTEXT,
+    max_in_flight=MAX_IN_FLIGHT,
+    page_reuse=PAGE_REUSE,
+    zip_cache_file=CACHE_FILE,
+    race_width=RACE_WIDTH,
+    block_resources=BLOCK_RESOURCES,
+    journal_file=JOURNAL_FILE,
+    resume=False,
+    retry_only=False,
+    failed_dir=FAILED_DIR,
+    max_attempts=MAX_ATTEMPTS,
+    snapshot_dir=None,
+    headless=HEADLESS,
+    stats=None,
+    queue_db=None,
+    adaptive=ADAPTIVE_CONCURRENCY,
+    trace_file=None,
+    fingerprint_file=FINGERPRINT_FILE,
+    refresh_ttl_days=REFRESH_TTL_DAYS,
+    change_detection=CHANGE_DETECTION,
+    browser_args=None,
+):
+    """
+    Crawl every product in <base_dir>/*/links.json with `concurrency`
+    browser contexts x `pages_per_context` worker pages pulling from one
+    bounded queue, then write <output_dir>/<Category>/results.json.
+
+    Every attempt is appended to the crawl journal. A full crawl starts a
+    new journal run; `resume` skips URLs already completed in the current
+    run; `retry_only` re-crawls just the failed / missing ones, retrying
+    each with exponential backoff up to `max_attempts` in that run.
+
+    With `snapshot_dir`, each product's final DOM and widget responses are
+    saved to a SnapshotStore for offline replay (see replay_all).
+
+    Step waits and whole-product latency ("product") are recorded in
+    `stats` (default: the module-wide LATENCY).
+
+    With `queue_db`, jobs are claimed from a shared SQLite WorkQueue
+    instead of links.json, so several processes / hosts can drain it
+    together; results.json is then written from every result in the queue.
+
+    With `adaptive`, an AIMDController sets how many of the worker pages
+    may hit a host at once. Each product holds a slot on its own host and
+    on the widget backends seen for it; the limits follow the latency and
+    error rate of the individual requests to those hosts.
+
+    With `trace_file`, per-step timing spans for every product are appended
+    there as JSONL (see span_trace.py for the report).
+
+    With `change_detection`, every page is first fetched over plain HTTP
+    and fingerprinted; unchanged pages reuse their last Amazon result
+    unless it is older than `refresh_ttl_days`.
+    """
+    links = load_links(base_dir)
+    journal = CrawlJournal(journal_file)
+    work_queue = WorkQueue(queue_db, max_attempts=max_attempts) if queue_db else None
+    if work_queue:
+        jobs = []
+        total = work_queue.remaining()
+        mode = f"queue {work_queue.owner}"
+    else:
+        if not (resume or retry_only):
+            # a full crawl starts over: attempts/completions from older runs don't count
+            journal.start_run()
+        jobs = plan_jobs(links, journal, resume, retry_only, failed_dir, max_attempts)
+        total = len(jobs)
+        mode = "retry-only" if retry_only else "resume" if resume else "full"
+    print(f"📦 {total} products to crawl ({mode}), journal: {json.dumps(journal.counts())}")
+
+    queue = asyncio.Queue(maxsize=max_in_flight)
+    in_flight = asyncio.Semaphore(max_in_flight)
+    results = defaultdict(dict)
+    zip_cache = ZipCache(zip_cache_file)
+    route_reports = []
+    store = SnapshotStore(snapshot_dir) if snapshot_dir else None
+    stats = stats or LATENCY
+    leased = set()
+    limiter = AIMDController(max_limit=concurrency * pages_per_context) if adaptive else None
+    tracer = Tracer(trace_file) if trace_file else None
+    fingerprints = PageFingerprints(fingerprint_file, refresh_ttl_days) if change_detection else None
+    page_fps = {}
+    if fingerprints and jobs:
+        started = time.perf_counter()
+        page_fps = await asyncio.to_thread(fingerprints.check_all, [url for _, url in jobs])
+        print(f"🔎 Fingerprinted {len(page_fps)} pages in {time.perf_counter() - started:.1f}s")
+    done = 0
+
+    async def worker(context):
+        nonlocal done
+        router = RequestRouter(reports=route_reports) if block_resources else None
+        signals = RequestSignals(limiter, is_wtb_response) if limiter else None
+        page = await context.new_page()
+        if router:
+            await router.install(page)
+        if signals:
+            signals.attach(page)
+        used = 0
+        while True:
+            job = await queue.get()
+            if job is None:
+                queue.task_done()
+                break
+
+            category, url = job
+            if used >= page_reuse:
+                await page.close()
+                page = await context.new_page()
+                if router:
+                    await router.install(page)
+                if signals:
+                    signals.attach(page)
+                used = 0
+
+            fingerprint = None
+            if fingerprints:
+                if url in page_fps:
+                    fingerprint = page_fps.pop(url)
+                else:
+                    fingerprint = await asyncio.to_thread(fingerprints.fingerprint, url)
+
+            while True:
+                attempt = journal.attempts(url) + 1
+                delay = backoff_delay(attempt) if retry_only else 0
+                if delay:
+                    print(f"⏳ Retry #{attempt} in {delay:.0f}s → {url}")
+                    await asyncio.sleep(delay)
+
+                cached = fingerprints.reuse(url, fingerprint) if fingerprints else None
+                if cached:
+                    print(f"♻  Unchanged page, reusing last result → {url}")
+                    result, state = cached, DONE
+                else:
+                    recorder = SnapshotRecorder(page) if store else None
+                    async with in_flight:
+                        hosts = limiter.hosts_for(url) if limiter else []
+                        if limiter:
+                            signals.host = hosts[0]
+                            await limiter.acquire(hosts)
+                        try:
+                            started = time.perf_counter()
+                            result = await extract_amazon(
+                                page,
+                                url,
+                                stats=stats,
+                                zip_cache=zip_cache,
+                                category=category,
+                                race_width=race_width,
+                                router=router,
+                                tracer=tracer,
+                                signals=signals,
+                            )
+                            stats.record("product", (time.perf_counter() - started) * 1000)
+                        finally:
+                            if limiter:
+                                await limiter.release(hosts)
+                        state = classify(result)
+                    if recorder:
+                        await recorder.save(store, url, category, result)
+                    if fingerprints:
+                        fingerprints.record(url, fingerprint, result)
+                journal.mark(url, category, state, result=result)
+                results[category][url] = result
+
+                if work_queue:
+                    if state == FAILED:
+                        work_queue.fail(url, result=result)
+                    else:
+                        work_queue.complete(url, result)
+                    leased.discard(url)
+                    break
+
+                if state == DONE or not retry_only or journal.attempts(url) >= max_attempts:
+                    break
+
+            used += 1
+            done += 1
+            limit = f" (limit {limiter.limit(limiter.hosts_for(url)[0])})" if limiter else ""
+            print(f"✅ [{done}/{total}] {category} → {url}{limit}")
+            queue.task_done()
+
+        await page.close()
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless, args=browser_args or [])
+        contexts = [await browser.new_context() for _ in range(concurrency)]
+        workers = [
+            asyncio.create_task(worker(ctx))
+            for ctx in contexts
+            for _ in range(pages_per_context)
+        ]
+
+        if work_queue:
+            heartbeat = asyncio.create_task(_extend_leases(work_queue, leased))
+            await _feed_from_queue(work_queue, queue, journal, leased)
+        else:
+            for category, url in jobs:
+                journal.mark(url, category, PENDING)
+                await queue.put((category, url))
+        for _ in workers:
+            await queue.put(None)
+
+        await asyncio.gather(*workers)
+        if work_queue:
+            heartbeat.cancel()
+        for ctx in contexts:
+            await ctx.close()
+        await browser.close()
+
+    stats.print_summary()
+    zip_cache.save()
+    print("📍 ZIP cache:", json.dumps(zip_cache.summary()))
+    if limiter:
+        print("🎚  Hosts:", json.dumps(limiter.snapshot()))
+    if route_reports:
+        print("🧹 Requests:", json.dumps(summarize_routes(route_reports)))
+
+    print("📓 Journal:", json.dumps(journal.counts()))
+    if fingerprints:
+        fingerprints.save()
+        print(f"♻  Unchanged pages reused: {fingerprints.reused}/{total}")
+    if tracer:
+        tracer.close()
+        print(f"🧭 Trace: {tracer.path} (python span_trace.py {tracer.path})")
+    if store:
+        store.flush()
+        print(f"📸 Snapshots: {len(store.index)} products in {store.root}")
+
+    if work_queue:
+        print("📋 Queue:", json.dumps(work_queue.counts()))
+        save_all_results(output_dir, links, work_queue.results())
+        work_queue.close()
+    else:
+        save_all_results(output_dir, links, results, journal)
+    journal.close()
+    return results
+
+
+async def _feed_from_queue(work_queue, queue, journal, leased):
+    """
+    Claim one job at a time (only when the local queue has room, so leases
+    don't tick while jobs sit here). When nothing is claimable but other
+    workers still hold leases, poll until they finish or their leases
+    expire.
+    """
+    while True:
+        batch = work_queue.claim(1)
+        if not batch:
+            if work_queue.remaining() == 0:
+                return
+            await asyncio.sleep(QUEUE_POLL_SECONDS)
+            continue
+        for category, url in batch:
+            leased.add(url)
+            journal.mark(url, category, PENDING)
+            await queue.put((category, url))
+
+
+async def _extend_leases(work_queue, leased):
+    while True:
+        await asyncio.sleep(work_queue.lease_seconds / 3)
+        for url in list(leased):
+            if not work_queue.extend(url):
+                leased.discard(url)
+
+
+async def extract_from_snapshot(page, store, manifest):
+    """
+    Re-run the extraction selectors against a stored snapshot. The page
+    must have JS disabled and no network. The Amazon link comes from the
+    recorded widget payloads; failing that, when a click-path selector
+    matches the stored DOM, from the URL the recorded popup navigated to,
+    or the button's own href / data-href.
+    """
+    await page.set_content(store.get_text(manifest["dom"]), wait_until="domcontentloaded")
+
+    title_elem = await page.query_selector(SEL_TITLE)
+    title = (await title_elem.inner_text()).strip() if title_elem else None
+
+    img_elem = await page.query_selector(SEL_IMAGE)
+    img_url = await img_elem.get_attribute("src") if img_elem else None
+
+    amazon_link = store.payload_link(manifest)
+
+    if not amazon_link:
+        for selector in (f"{SEL_AMAZON_BLOCK} {SEL_BUY_BUTTON}", SEL_AMAZON_SELLER_BTN):
+            button = await page.query_selector(selector)
+            if not button:
+                continue
+            amazon_link = popup_link(manifest)
+            for attr in ("href", "data-href"):
+                amazon_link = amazon_link or await button.get_attribute(attr)
+            break
+
+    return {
+        "title": title,
+        "image": img_url,
+        "amazon": amazon_link
+    }
+
+
+async def replay_all(snapshot_dir=SNAPSHOT_DIR, output_dir=OUTPUT_DIR, links_dir=LINKS_DIR):
+    """Re-extract every stored snapshot with no network and rewrite results.json."""
+    store = SnapshotStore(snapshot_dir)
+    results = defaultdict(dict)
+    changed = 0
+    start = time.perf_counter()
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        context = await browser.new_context(java_script_enabled=False, offline=True)
+        await context.route("**/*", lambda route: route.abort())
+        page = await context.new_page()
+
+        for url, manifest in store.items():
+            result = await extract_from_snapshot(page, store, manifest)
+            results[manifest.get("category") or "Unknown"][url] = result
+            if result != manifest.get("result"):
+                changed += 1
+
+        await browser.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"📼 Replayed {len(store.index)} snapshots in {elapsed:.1f}s ({changed} differ from live)")
+    save_all_results(output_dir, load_links(links_dir), results)
+    return results
+
+
+async def test_single_product():
     test_url = "https://www.kindsnacks.com/products/thins/caramel-almond-sea-salt"
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=HEADLESS)
-        page = browser.new_page()
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=HEADLESS)
+        page = await browser.new_page()
+
+        result = await extract_amazon(page, test_url)
 
-        result = extract_amazon(page, test_url)
+        await browser.close()
 
-        browser.close()
+    LATENCY.print_summary()
 
     print("\n===================")
     print("FINAL RESULT")
@@ -147,4 +826,67 @@ def test_single_product():
 
 
 if __name__ == "__main__":
-    test_single_product()
+    parser = argparse.ArgumentParser(description="KIND → Amazon WTB scraper")
+    parser.add_argument("--all", action="store_true", help="crawl every links.json")
+    parser.add_argument("--links-dir", default=LINKS_DIR)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--pages-per-context", type=int, default=PAGES_PER_CONTEXT)
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT)
+    parser.add_argument("--page-reuse", type=int, default=PAGE_REUSE)
+    parser.add_argument("--zip-cache", default=CACHE_FILE)
+    parser.add_argument("--race-width", type=int, default=RACE_WIDTH,
+                        help="pages used to race ZIPs after the learned ZIP misses")
+    parser.add_argument("--no-block", action="store_true",
+                        help="load images/fonts/media/trackers on product pages")
+    parser.add_argument("--journal", default=JOURNAL_FILE)
+    parser.add_argument("--resume", action="store_true",
+                        help="skip URLs the journal already has as completed")
+    parser.add_argument("--retry-only", action="store_true",
+                        help="re-crawl only failed/missing URLs with backoff")
+    parser.add_argument("--failed-dir", default=FAILED_DIR,
+                        help="dir with <Category>/failed.json + missing.json")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+    parser.add_argument("--record", nargs="?", const=SNAPSHOT_DIR, default=None,
+                        help="save DOM + widget responses per product to this store")
+    parser.add_argument("--adaptive-concurrency", action="store_true",
+                        help="let an AIMD per-host limit pick how many worker pages run")
+    parser.add_argument("--worker", nargs="?", const=QUEUE_DB, default=None,
+                        help="claim jobs from a shared SQLite queue (see work_queue.py)")
+    parser.add_argument("--no-skip", action="store_true",
+                        help="crawl every page even if its fingerprint is unchanged")
+    parser.add_argument("--refresh-ttl", type=float, default=REFRESH_TTL_DAYS,
+                        help="days before an unchanged page is crawled again anyway")
+    parser.add_argument("--trace", nargs="?", const=TRACE_FILE, default=None,
+                        help="append per-step timing spans (JSONL) to this file")
+    parser.add_argument("--replay", nargs="?", const=SNAPSHOT_DIR, default=None,
+                        help="re-extract from a snapshot store without network")
+    args = parser.parse_args()
+
+    if args.replay:
+        asyncio.run(replay_all(args.replay, args.output_dir, args.links_dir))
+    elif args.all or args.resume or args.retry_only or args.worker:
+        asyncio.run(crawl_all(
+            base_dir=args.links_dir,
+            output_dir=args.output_dir,
+            concurrency=args.concurrency,
+            pages_per_context=args.pages_per_context,
+            max_in_flight=args.max_in_flight,
+            page_reuse=args.page_reuse,
+            zip_cache_file=args.zip_cache,
+            race_width=args.race_width,
+            block_resources=not args.no_block,
+            journal_file=args.journal,
+            resume=args.resume,
+            retry_only=args.retry_only,
+            failed_dir=args.failed_dir,
+            max_attempts=args.max_attempts,
+            snapshot_dir=args.record,
+            queue_db=args.worker,
+            adaptive=args.adaptive_concurrency or ADAPTIVE_CONCURRENCY,
+            trace_file=args.trace,
+            refresh_ttl_days=args.refresh_ttl,
+            change_detection=not args.no_skip,
+        ))
+    else:
+        asyncio.run(test_single_product())
@@ -0,0 +1,193 @@
+import json
+import os
+import random
+import time
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+JOURNAL_FILE = "crawl_journal.jsonl"
+FAILED_DIR = "all_products_1"
+
+MAX_ATTEMPTS = 4
+BACKOFF_BASE = 5.0     # seconds before the 2nd attempt, doubled after each
+BACKOFF_MAX = 120.0
+
+PENDING = "pending"
+DONE = "done"          # Amazon link found
+MISSING = "missing"    # page worked, no Amazon link
+FAILED = "failed"      # extraction raised / page never loaded
+
+COMPLETED = {DONE, MISSING}
+
+
+def classify(result):
+    """Journal state for an extract_amazon result."""
+    if not result or (result.get("title") is None and result.get("amazon") is None):
+        return FAILED
+    return DONE if result.get("amazon") else MISSING
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Seconds to wait before `attempt` (1-based); 0 for the first try."""
+    if attempt <= 1:
+        return 0.0
+    delay = min(cap, base * 2 ** (attempt - 2))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class CrawlJournal:
+    """
+    Append-only JSONL log of per-URL crawl state. Replaying it gives the
+    latest state, attempt count and last result of every URL, which is
+    what resume / retry-only runs work from.
+
+    Records belong to a run. A full crawl starts a new one with
+    start_run(); resume and retry-only continue the latest. Attempts and
+    "completed" only count within the current run, so last week's
+    successes and failures don't block or delay this week's retries.
+    """
+
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        self.entries = {}
+        self.run = 0  # journals written before runs existed replay as run 0
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        self._apply(json.loads(line))
+                    except ValueError:
+                        continue  # torn last line from a crash
+        self._fh = open(path, "a", encoding="utf-8")
+
+    def _apply(self, rec):
+        run = rec.get("run", 0)
+        self.run = max(self.run, run)
+        if "url" not in rec:
+            return  # run marker
+        entry = self.entries.setdefault(
+            rec["url"], {"state": PENDING, "attempts": 0, "category": None, "result": None, "run": run}
+        )
+        entry["run"] = run
+        entry["state"] = rec["state"]
+        entry["category"] = rec.get("category") or entry["category"]
+        entry["attempts"] = rec.get("attempts", entry["attempts"])
+        if rec.get("result") is not None:
+            entry["result"] = rec["result"]
+
+    def _write(self, rec):
+        self._fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self._fh.flush()
+        self._apply(rec)
+
+    def start_run(self):
+        """Begin a new run (full crawl): attempts and completions start over."""
+        self._write({"ts": round(time.time(), 3), "run": self.run + 1})
+        return self.run
+
+    def mark(self, url, category, state, result=None, error=None):
+        attempts = self.attempts(url) + (0 if state == PENDING else 1)
+        rec = {
+            "ts": round(time.time(), 3),
+            "run": self.run,
+            "url": url,
+            "category": category,
+            "state": state,
+            "attempts": attempts,
+        }
+        if result is not None:
+            rec["result"] = result
+        if error:
+            rec["error"] = str(error)
+        self._write(rec)
+        return attempts
+
+    def state(self, url):
+        return self.entries.get(url, {}).get("state")
+
+    def attempts(self, url):
+        """Attempts in the current run."""
+        entry = self.entries.get(url)
+        if not entry or entry["run"] != self.run:
+            return 0
+        return entry["attempts"]
+
+    def result(self, url, current_run=False):
+        """Last recorded result; with current_run, only one from this run."""
+        entry = self.entries.get(url)
+        if not entry or (current_run and entry["run"] != self.run):
+            return None
+        return entry["result"]
+
+    def category(self, url):
+        return self.entries.get(url, {}).get("category")
+
+    def is_completed(self, url):
+        """Done or missing in the current run."""
+        entry = self.entries.get(url)
+        return bool(entry) and entry["run"] == self.run and entry["state"] in COMPLETED
+
+    def retry_candidates(self):
+        """
+        {category: [url]} for URLs whose last state is failed or missing,
+        plus ones left pending by a crashed retry (attempts > 0).
+        """
+        out = {}
+        for url, entry in self.entries.items():
+            retry = entry["state"] in (FAILED, MISSING)
+            if entry["state"] == PENDING and self.attempts(url) > 0:
+                retry = True
+            if retry:
+                out.setdefault(entry["category"] or "Unknown", []).append(url)
+        return out
+
+    def counts(self):
+        counts = {}
+        for entry in self.entries.values():
+            counts[entry["state"]] = counts.get(entry["state"], 0) + 1
+        return counts
+
+    def close(self):
+        self._fh.close()
+
+
+def _entry_url(entry):
+    if isinstance(entry, str):
+        return entry
+    if isinstance(entry, dict):
+        return entry.get("product_url") or entry.get("source_product_url") or entry.get("url")
+    return None
+
+
+def load_failed_missing(base_dir=FAILED_DIR):
+    """
+    {category: [url]} from <base_dir>/<Category>/failed.json + missing.json
+    and <base_dir>/failed_overall.json (entries may be URLs or dicts).
+    """
+    out = {}
+
+    def add(category, path):
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        for e in entries:
+            url = _entry_url(e)
+            cat = (e.get("category") if isinstance(e, dict) else None) or category
+            if url and url not in out.setdefault(cat, []):
+                out[cat].append(url)
+
+    if not os.path.isdir(base_dir):
+        return out
+    for category in sorted(os.listdir(base_dir)):
+        cat_dir = os.path.join(base_dir, category)
+        if not os.path.isdir(cat_dir):
+            continue
+        add(category, os.path.join(cat_dir, "failed.json"))
+        add(category, os.path.join(cat_dir, "missing.json"))
+    add("Unknown", os.path.join(base_dir, "failed_overall.json"))
+    return out
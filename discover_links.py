@@ -0,0 +1,301 @@
+###############################################
+# Category discovery → links.json diffs
+###############################################
+# Walks the kindsnacks sitemap (and any category listing pages configured
+# below) with a pool of keep-alive HTTP workers, canonicalizes and dedupes
+# product URLs, and compares them with <links_dir>/<Category>/links.json.
+# Only the difference is emitted, per category, as links_diff.json:
+#
+#   {"added": [...], "removed": [...], "discovered": N, "checked_at": ...}
+#
+# Removals are held back (listed, never applied) for a category when any
+# page feeding it failed to fetch, or when they would drop more than
+# MAX_REMOVED_SHARE of its links: a partial sitemap is not a smaller catalog.
+# Such diffs carry a "held" reason.
+#
+#   python discover_links.py                   # write diffs only
+#   python discover_links.py --apply           # also update links.json
+#   python discover_links.py --seed-queue      # queue added URLs for cat.py --worker
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+from resolve_redirects import ConnectionPool
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+LINKS_DIR = "kind_products_final"
+SITE = "https://www.kindsnacks.com"
+SITEMAP_URL = f"{SITE}/sitemap.xml"
+CONCURRENCY = 8
+MAX_LISTING_PAGES = 20     # pagination cap per category listing
+ALL_CATEGORY = "All_Snacks"
+MAX_REMOVED_SHARE = 0.25   # hold removals above this share of a category's links
+
+# Optional listing pages per category folder. Categories listed here are
+# crawled directly (following ?page=N); the others get sitemap products by
+# product line, learned from their current links.json.
+CATEGORY_PAGES = {
+    # "Nut_Bars": f"{SITE}/snacks/nut-bars",
+}
+
+LOC_RE = re.compile(r"<loc>\s*([^<\s]+)\s*</loc>", re.I)
+PRODUCT_HREF_RE = re.compile(r'href="([^"]*/products/[^"/?#]+/[^"/?#]+/?(?:[?#][^"]*)?)"', re.I)
+
+
+# ---------------------------------------------------------
+# URL HELPERS
+# ---------------------------------------------------------
+def canonical_url(url, base=SITE):
+    """https, www host, lowercase path, no query / fragment / trailing slash."""
+    u = urlparse(urljoin(base + "/", url.strip()))
+    host = (u.hostname or "").lower()
+    if host == "kindsnacks.com":
+        host = "www.kindsnacks.com"
+    scheme = "https" if host.endswith("kindsnacks.com") else u.scheme
+    netloc = host + (f":{u.port}" if u.port else "")
+    return f"{scheme}://{netloc}{u.path.lower().rstrip('/')}"
+
+
+def product_line(url):
+    """'nut-bar' for .../products/nut-bar/<slug>, else None."""
+    parts = urlparse(url).path.strip("/").split("/")
+    if len(parts) == 3 and parts[0] == "products":
+        return parts[1]
+    return None
+
+
+def learn_line_map(existing):
+    """{product_line: {category}} from the current links.json files."""
+    lines = {}
+    for category, urls in existing.items():
+        if category == ALL_CATEGORY:
+            continue
+        for url in urls:
+            line = product_line(canonical_url(url))
+            if line:
+                lines.setdefault(line, set()).add(category)
+    return lines
+
+
+def load_existing(links_dir=LINKS_DIR):
+    existing = {}
+    for category in sorted(os.listdir(links_dir)):
+        path = os.path.join(links_dir, category, "links.json")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                existing[category] = json.load(f)
+    return existing
+
+
+# ---------------------------------------------------------
+# DISCOVERY
+# ---------------------------------------------------------
+class Discoverer:
+    def __init__(self, concurrency=CONCURRENCY, base=SITE):
+        self.pool = ConnectionPool()
+        self.concurrency = concurrency
+        self.base = base
+        self.fetched = 0
+        self.errors = []
+        self.incomplete = set()   # categories with a failed fetch behind them
+
+    def fetch(self, url, missing_ok=False):
+        """Page text, "" for a 404 when `missing_ok`, None on any failure."""
+        try:
+            status, _, body = self.pool.request("GET", url)
+        except Exception as e:
+            self.errors.append((url, str(e)))
+            return None
+        self.fetched += 1
+        if status == 404 and missing_ok:
+            return ""
+        if status != 200:
+            self.errors.append((url, f"HTTP {status}"))
+            return None
+        return body.decode("utf-8", "ignore")
+
+    def sitemap_products(self, sitemap_url):
+        """
+        (product URLs, complete): every product URL in a sitemap, following
+        sitemap indexes level by level; complete is False if any fetch failed.
+        """
+        products = set()
+        pending = [sitemap_url]
+        seen = set()
+        complete = True
+        with ThreadPoolExecutor(max_workers=self.concurrency) as ex:
+            while pending:
+                seen.update(pending)
+                nested = []
+                for xml in ex.map(self.fetch, pending):
+                    if xml is None:
+                        complete = False
+                        continue
+                    is_index = "<sitemapindex" in xml
+                    for loc in LOC_RE.findall(xml):
+                        if is_index:
+                            if loc not in seen:
+                                nested.append(loc)
+                        elif product_line(canonical_url(loc, self.base)):
+                            products.add(canonical_url(loc, self.base))
+                pending = nested
+        return products, complete
+
+    def listing_products(self, listing_url):
+        """
+        (product URLs, complete): product links from a category listing,
+        following ?page=N until nothing new (a 404 past page 1 is the end).
+        """
+        products = set()
+        for page in range(1, MAX_LISTING_PAGES + 1):
+            url = listing_url if page == 1 else f"{listing_url}?page={page}"
+            html = self.fetch(url, missing_ok=page > 1)
+            if html is None:
+                return products, False
+            if not html:
+                break
+            found = {canonical_url(h, self.base) for h in PRODUCT_HREF_RE.findall(html)}
+            found = {u for u in found if product_line(u)}
+            if not found - products:
+                break
+            products |= found
+        return products, True
+
+    def discover(self, existing, sitemap_url=SITEMAP_URL, category_pages=CATEGORY_PAGES):
+        """{category: set(canonical product URLs)}"""
+        discovered = {category: set() for category in existing}
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as ex:
+            listed = {}
+            for category, (urls, complete) in zip(
+                category_pages, ex.map(self.listing_products, category_pages.values())
+            ):
+                listed[category] = urls
+                if not complete:
+                    self.incomplete.update((category, ALL_CATEGORY))
+        for category, urls in listed.items():
+            discovered.setdefault(category, set()).update(urls)
+
+        sitemap, complete = self.sitemap_products(sitemap_url) if sitemap_url else (set(), True)
+        if not complete:
+            self.incomplete.update(c for c in discovered if c not in category_pages)
+            self.incomplete.add(ALL_CATEGORY)
+        line_map = learn_line_map(existing)
+        for url in sitemap:
+            for category in line_map.get(product_line(url), ()):
+                if category not in category_pages:
+                    discovered[category].add(url)
+
+        if ALL_CATEGORY in discovered:
+            discovered[ALL_CATEGORY] |= sitemap
+            for urls in listed.values():
+                discovered[ALL_CATEGORY] |= urls
+        return discovered
+
+
+def diff_links(existing, discovered, incomplete=(), max_removed_share=MAX_REMOVED_SHARE):
+    """
+    {category: {"added", "removed", "discovered"[, "held"]}}. A category
+    that came back empty is skipped (fetch failure, not a catalog wipe).
+    "held" says why the removals must not be applied: a failed fetch
+    behind the category (`incomplete`), or too large a share removed.
+    """
+    diffs = {}
+    for category, found in sorted(discovered.items()):
+        current = [canonical_url(u) for u in existing.get(category, [])]
+        if not found:
+            if current:
+                print(f"⚠ {category}: nothing discovered, keeping {len(current)} links")
+            continue
+        current_set = set(current)
+        removed = [u for u in dict.fromkeys(current) if u not in found]
+        diffs[category] = {
+            "added": sorted(found - current_set),
+            "removed": removed,
+            "discovered": len(found),
+        }
+        if removed and category in incomplete:
+            diffs[category]["held"] = "fetch errors"
+        elif removed and len(removed) > max_removed_share * len(current_set):
+            diffs[category]["held"] = f"{len(removed)}/{len(current_set)} links removed"
+    return diffs
+
+
+def write_diffs(links_dir, existing, diffs, apply=False):
+    now = time.strftime("%Y-%m-%dT%H:%M:%S")
+    for category, d in diffs.items():
+        folder = os.path.join(links_dir, category)
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, "links_diff.json"), "w", encoding="utf-8") as f:
+            json.dump({**d, "checked_at": now}, f, indent=2)
+
+        # held removals are only reported; additions still go in
+        removed = set() if d.get("held") else set(d["removed"])
+        if apply and (d["added"] or removed):
+            kept = [u for u in existing.get(category, []) if canonical_url(u) not in removed]
+            links = list(dict.fromkeys(kept + d["added"]))
+            tmp = os.path.join(folder, "links.json.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(links, f, indent=2)
+            os.replace(tmp, os.path.join(folder, "links.json"))
+
+
+def run(links_dir=LINKS_DIR, sitemap_url=SITEMAP_URL, category_pages=CATEGORY_PAGES,
+        concurrency=CONCURRENCY, base=SITE, apply=False, seed_queue=None):
+    start = time.perf_counter()
+    existing = load_existing(links_dir)
+    d = Discoverer(concurrency, base)
+    discovered = d.discover(existing, sitemap_url, category_pages)
+    total = len(set().union(*discovered.values())) if discovered else 0
+    if not total:
+        print(f"❌ No products discovered ({len(d.errors)} fetch errors), leaving links.json alone")
+        return {}
+
+    diffs = diff_links(existing, discovered, d.incomplete)
+    write_diffs(links_dir, existing, diffs, apply)
+
+    for category, diff in diffs.items():
+        if diff["added"] or diff["removed"]:
+            held = f", removals held: {diff['held']}" if diff.get("held") else ""
+            print(f"🔁 {category}: +{len(diff['added'])} -{len(diff['removed'])} ({diff['discovered']} live{held})")
+    added = sum(len(x["added"]) for x in diffs.values())
+    removed = sum(len(x["removed"]) for x in diffs.values() if not x.get("held"))
+    held = sum(len(x["removed"]) for x in diffs.values() if x.get("held"))
+    print(
+        f"🧭 {total} unique products, {d.fetched} pages fetched in "
+        f"{time.perf_counter() - start:.1f}s → +{added} -{removed}"
+        + (f" ({held} removals held)" if held else "")
+        + (" (links.json updated)" if apply else "")
+    )
+    for url, err in d.errors[:5]:
+        print(f"⚠ {url}: {err}")
+
+    if seed_queue and added:
+        from work_queue import WorkQueue
+
+        q = WorkQueue(seed_queue)
+        n = q.seed({c: x["added"] for c, x in diffs.items() if x["added"]})
+        q.close()
+        print(f"🌱 Queued {n} new URLs in {seed_queue}")
+    return diffs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Discover product URLs and diff them against links.json")
+    parser.add_argument("--links-dir", default=LINKS_DIR)
+    parser.add_argument("--sitemap", default=SITEMAP_URL)
+    parser.add_argument("--base", default=SITE, help="site root for relative links")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--apply", action="store_true", help="rewrite links.json with the diff applied")
+    parser.add_argument("--seed-queue", nargs="?", const="crawl_queue.sqlite", default=None,
+                        help="add the new URLs to a cat.py --worker queue")
+    args = parser.parse_args()
+
+    run(args.links_dir, args.sitemap, CATEGORY_PAGES, args.concurrency, args.base,
+        args.apply, args.seed_queue)
@@ -1,57 +1,43 @@
+import argparse
 import os
-import json
+
+from merge_index import PARSE_WORKERS, incremental_merge, merge_order
+from stream_merge import STREAM_OUTPUT, stream_merge
 
 BASE_DIR = "all_products_3"
 OUTPUT_FILE = "all_products_merged.json"
 
-def normalize_json():
-    merged = {}
-    category_order = []
-
+def normalize_json(full=False, stream=False, workers=PARSE_WORKERS):
     # Collect categories and ensure All_Snacks comes LAST
-    for c in os.listdir(BASE_DIR):
-        if c == "All_Snacks":
-            continue
-        category_order.append(c)
-
-    # Append All_Snacks at the end
-    if "All_Snacks" in os.listdir(BASE_DIR):
-        category_order.append("All_Snacks")
+    category_order = merge_order(BASE_DIR)
 
     print("\nProcessing categories in order:")
     print(category_order)
 
-    for category in category_order:
-        path = os.path.join(BASE_DIR, category, "results.json")
-        if not os.path.exists(path):
-            continue
-
-        print(f"Processing: {path}")
-
-        with open(path, "r", encoding="utf-8") as f:
-            items = json.load(f)
-
-        for item in items:
-            asin = item.get("asin")
-            if not asin:
-                continue
-
-            # Add category
-            item["category"] = category
+    if stream:
+        # bounded memory: NDJSON out, only the ASIN-seen set kept
+        stream_merge(BASE_DIR, category_order, STREAM_OUTPUT)
+        return
 
-            # RULE:
-            # ✔ If ASIN already exists, do NOT override (keep real category first)
-            if asin not in merged:
-                merged[asin] = item
+    # RULE:
+    # ✔ If ASIN already exists, do NOT override (keep real category first)
+    # Only categories whose results.json changed are re-parsed (merge_index.py),
+    # in a process pool; precedence is applied afterwards in this process.
+    stats = incremental_merge(BASE_DIR, category_order, OUTPUT_FILE, full=full, workers=workers)
 
-    # Save merged unique items
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as out:
-        json.dump(list(merged.values()), out, indent=2, ensure_ascii=False)
+    for category in stats["reparsed"]:
+        print(f"Processing: {os.path.join(BASE_DIR, category, 'results.json')}")
 
     print("\n🎉 Finished Normalizing!")
-    print("Unique ASINs:", len(merged))
+    print("Unique ASINs:", stats["items"])
     print("Output:", OUTPUT_FILE)
 
 
 if __name__ == "__main__":
-    normalize_json()
+    parser = argparse.ArgumentParser(description="Merge all_products_3 into one ASIN list")
+    parser.add_argument("--full", action="store_true", help="ignore the merge index and re-parse everything")
+    parser.add_argument("--stream", action="store_true",
+                        help=f"stream items into {STREAM_OUTPUT} instead (flat memory)")
+    parser.add_argument("--workers", type=int, default=PARSE_WORKERS, help="parser processes (1 = serial)")
+    args = parser.parse_args()
+    normalize_json(full=args.full, stream=args.stream, workers=args.workers)
@@ -0,0 +1,246 @@
+import asyncio
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+INITIAL_LIMIT = 2
+MIN_LIMIT = 1
+MAX_LIMIT = 16
+
+WINDOW = 8                 # request samples per adjustment decision
+ERROR_THRESHOLD = 0.25     # error rate in a window that triggers a back-off
+LATENCY_FACTOR = 2.0       # window p50 above best-seen p50 x this = overloaded
+DECREASE = 0.5             # multiplicative decrease
+INCREASE = 1               # additive increase per healthy, saturated window
+
+# Requests that count as a signal for their host; images, fonts and other
+# sub-resources (often aborted by the router) are left out.
+SIGNAL_TYPES = ("document", "xhr", "fetch")
+BAD_STATUS = (429,)        # besides 5xx
+
+
+def host_of(url):
+    return urlparse(url).hostname or "unknown"
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2] if values else None
+
+
+def _response_end_ms(request):
+    try:
+        end = request.timing.get("responseEnd", -1)
+    except Exception:
+        return None
+    return end if end and end > 0 else None
+
+
+class _HostState:
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self.window = []          # (latency_ms, ok)
+        self.saturated = False    # hit the limit during this window
+        self.best_p50 = None
+        self.completed = deque()  # product completion timestamps for throughput
+        self.products = 0
+        self.total = 0            # request samples
+        self.errors = 0
+        self.changes = []         # (ts, old, new, reason)
+        self.cooldown = False     # skip one decrease right after a cut
+        self.cond = asyncio.Condition()
+
+
+class AIMDController:
+    """
+    Per-host in-flight limit with additive increase / multiplicative
+    decrease. A product holds one slot on every host it talks to (its own
+    host plus the widget backends linked to it) from acquire() to
+    release(). The signal is per request: RequestSignals feeds each
+    finished / failed request's latency into observe(), and every WINDOW
+    samples the host's limit goes up by INCREASE if the window was healthy
+    and the limit was actually reached, or is cut by DECREASE if errors
+    or latency (vs. the best window seen) spike.
+    """
+
+    def __init__(
+        self,
+        initial=INITIAL_LIMIT,
+        min_limit=MIN_LIMIT,
+        max_limit=MAX_LIMIT,
+        window=WINDOW,
+        error_threshold=ERROR_THRESHOLD,
+        latency_factor=LATENCY_FACTOR,
+    ):
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.window = window
+        self.error_threshold = error_threshold
+        self.latency_factor = latency_factor
+        self.hosts = {}
+        self.links = {}           # product host -> {backend hosts seen}
+        self.started = time.time()
+
+    def _host(self, host):
+        if host not in self.hosts:
+            self.hosts[host] = _HostState(self.initial)
+        return self.hosts[host]
+
+    def limit(self, host):
+        return self._host(host).limit
+
+    def link(self, host, backend):
+        """Remember that products on `host` also load `backend`."""
+        if backend != host:
+            self.links.setdefault(host, set()).add(backend)
+
+    def hosts_for(self, url):
+        host = host_of(url)
+        return [host] + sorted(self.links.get(host, ()))
+
+    async def acquire(self, hosts):
+        # always in sorted order, so two products can't each hold a slot
+        # the other one is waiting for
+        for host in sorted(set(hosts)):
+            st = self._host(host)
+            async with st.cond:
+                await st.cond.wait_for(lambda: st.in_flight < st.limit)
+                st.in_flight += 1
+                if st.in_flight >= st.limit:
+                    st.saturated = True
+
+    async def release(self, hosts):
+        for host in sorted(set(hosts)):
+            st = self._host(host)
+            async with st.cond:
+                st.in_flight -= 1
+                st.products += 1
+                st.completed.append(time.time())
+                st.cond.notify_all()
+
+    def observe(self, host, latency_ms, ok):
+        """One request to `host` finished (latency_ms may be None)."""
+        st = self._host(host)
+        st.total += 1
+        st.errors += 0 if ok else 1
+        st.window.append((latency_ms, ok))
+        if len(st.window) >= self.window:
+            old = st.limit
+            self._adjust(host, st)
+            if st.limit > old:
+                asyncio.get_running_loop().create_task(self._wake(st))
+
+    async def _wake(self, st):
+        async with st.cond:
+            st.cond.notify_all()
+
+    def _adjust(self, host, st):
+        latencies = [ms for ms, ok in st.window if ok and ms is not None]
+        error_rate = sum(1 for _, ok in st.window if not ok) / len(st.window)
+        p50 = _median(latencies)
+        old = st.limit
+
+        overloaded = None
+        if error_rate > self.error_threshold:
+            overloaded = f"errors {error_rate:.0%}"
+        elif p50 and st.best_p50 and p50 > st.best_p50 * self.latency_factor:
+            overloaded = f"p50 {p50:.0f}ms vs best {st.best_p50:.0f}ms"
+
+        if overloaded and st.cooldown:
+            # this window still ran at the old limit; judge the next one
+            reason = None
+        elif overloaded:
+            st.limit = max(self.min_limit, int(st.limit * DECREASE))
+            reason = overloaded
+        elif st.saturated:
+            st.limit = min(self.max_limit, st.limit + INCREASE)
+            reason = "healthy"
+        else:
+            reason = None
+
+        if p50 and (st.best_p50 is None or p50 < st.best_p50):
+            st.best_p50 = p50
+        if st.limit != old:
+            st.changes.append((round(time.time(), 1), old, st.limit, reason))
+            print(f"🎚  {host}: limit {old} → {st.limit} ({reason})")
+
+        st.cooldown = st.limit < old
+        st.window = []
+        st.saturated = st.in_flight >= st.limit
+
+    def throughput(self, host, horizon=60.0):
+        """Products finished per minute over the last `horizon` seconds."""
+        st = self._host(host)
+        now = time.time()
+        while st.completed and st.completed[0] < now - horizon:
+            st.completed.popleft()
+        span = min(horizon, max(1e-6, now - self.started))
+        return len(st.completed) / span * 60
+
+    def snapshot(self):
+        return {
+            host: {
+                "limit": st.limit,
+                "in_flight": st.in_flight,
+                "throughput_per_min": round(self.throughput(host), 1),
+                "completed": st.products,
+                "requests": st.total,
+                "error_rate": round(st.errors / st.total, 3) if st.total else 0.0,
+                "best_p50_ms": round(st.best_p50, 1) if st.best_p50 else None,
+                "limit_changes": len(st.changes),
+            }
+            for host, st in self.hosts.items()
+        }
+
+
+class RequestSignals:
+    """
+    Feeds an AIMDController from page events. Only document / xhr / fetch
+    requests to the current product host or a widget backend count; a
+    429 / 5xx response or a failed request is an error sample.
+    """
+
+    def __init__(self, controller, is_backend):
+        self.controller = controller
+        self.is_backend = is_backend
+        self.host = None          # product host of the page's current job
+        self._bad = set()
+
+    def attach(self, page):
+        page.on("response", self._on_response)
+        page.on("requestfinished", self._on_finished)
+        page.on("requestfailed", self._on_failed)
+
+    def _tracked(self, request):
+        if request.resource_type not in SIGNAL_TYPES:
+            return None
+        host = host_of(request.url)
+        if host == self.host:
+            return host
+        if self.is_backend(request):
+            if self.host:
+                self.controller.link(self.host, host)
+            return host
+        return None
+
+    def _on_response(self, response):
+        if response.status >= 500 or response.status in BAD_STATUS:
+            self._bad.add(response.request)
+
+    def _on_finished(self, request):
+        host = self._tracked(request)
+        bad = request in self._bad
+        self._bad.discard(request)
+        if host:
+            self.controller.observe(host, _response_end_ms(request), not bad)
+
+    def _on_failed(self, request):
+        self._bad.discard(request)
+        host = self._tracked(request)
+        if host:
+            self.controller.observe(host, None, False)
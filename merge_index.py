@@ -0,0 +1,261 @@
+###############################################
+# Incremental ASIN merge (amazon_norm / dupicate)
+###############################################
+# Keeps a sidecar index next to the merged output:
+#
+#   categories: {category: {size, mtime_ns, sha256, asins: [...]}}
+#   origin:     {asin: category that supplies it in the merged output}
+#   spans:      {asin: [offset, length]} of its item in the merged file (bytes)
+#   order:      category order of the last merge
+#   output:     size / mtime / sha256 of the merged file we wrote
+#
+# A run stats every results.json, hashes only files whose size/mtime moved,
+# and re-parses only the changed categories plus any category that newly
+# wins one of their ASINs (e.g. All_Snacks when a real category drops an
+# item). Every other item is sliced out of the previous merged output by
+# its span, without decoding it, so the result matches a full merge byte
+# for byte. The previous file is still read once (O(catalog) bytes), but
+# only the re-parsed categories are decoded and serialized.
+#
+# Categories to re-parse are decoded in a process pool (largest first). Each
+# worker sends back only {asin: item text}, already serialized the way the
+# merged file holds it, since pickling bytes is far cheaper than pickling
+# nested dicts. The first-wins precedence is applied afterwards in the main
+# process, so the result never depends on which worker finishes first.
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+INDEX_SUFFIX = ".index.json"
+INDEX_VERSION = 2
+ALL_CATEGORY = "All_Snacks"
+
+PARSE_WORKERS = os.cpu_count() or 1
+# Below this much JSON the pool's startup costs more than it saves
+MIN_PARALLEL_BYTES = 1 << 20
+
+
+def merge_order(base_dir):
+    """dupicate.py's precedence: directory order, All_Snacks last."""
+    names = os.listdir(base_dir)
+    order = [c for c in names if c != ALL_CATEGORY]
+    if ALL_CATEGORY in names:
+        order.append(ALL_CATEGORY)
+    return order
+
+
+def index_path_for(output_file):
+    root, _ = os.path.splitext(output_file)
+    return root + INDEX_SUFFIX
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _stat(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def item_text(item):
+    """One item as it appears inside json.dumps(items, indent=2, ensure_ascii=False)."""
+    return ("  " + json.dumps(item, indent=2, ensure_ascii=False).replace("\n", "\n  ")).encode("utf-8")
+
+
+def dump_items(texts):
+    """Same bytes as json.dumps(items, indent=2, ensure_ascii=False) from item_text()s."""
+    return b"[\n" + b",\n".join(texts) + b"\n]" if texts else b"[]"
+
+
+def _parse_category(category, data):
+    """{asin: item_text} for items with an ASIN, first occurrence per file, tagged with category."""
+    items = {}
+    for item in json.loads(data):
+        asin = item.get("asin")
+        if not asin or asin in items:
+            continue
+        item["category"] = category
+        items[asin] = item_text(item)
+    return items
+
+
+def _parse_file(category, path):
+    with open(path, "rb") as f:
+        return _parse_category(category, f.read())
+
+
+def parse_categories(base_dir, categories, workers=PARSE_WORKERS):
+    """{category: {asin: item_text}}, in a process pool when it pays off."""
+    paths = {c: os.path.join(base_dir, c, "results.json") for c in categories}
+    sizes = {c: os.path.getsize(p) for c, p in paths.items()}
+    if workers <= 1 or len(categories) < 2 or sum(sizes.values()) < MIN_PARALLEL_BYTES:
+        return {c: _parse_file(c, paths[c]) for c in categories}
+
+    # biggest files first so the longest parse starts right away
+    largest_first = sorted(categories, key=lambda c: -sizes[c])
+    with ProcessPoolExecutor(max_workers=min(workers, len(categories))) as ex:
+        futures = {c: ex.submit(_parse_file, c, paths[c]) for c in largest_first}
+        return {c: futures[c].result() for c in categories}
+
+
+def incremental_merge(base_dir, category_order, output_file, index_file=None, full=False,
+                      workers=PARSE_WORKERS):
+    """
+    Merge <base_dir>/<category>/results.json in `category_order`, keeping
+    the first item per ASIN, into `output_file`. Returns stats
+    ("items" is the number of ASINs written).
+    """
+    start = time.perf_counter()
+    index_file = index_file or index_path_for(output_file)
+    index = _load_json(index_file, {})
+
+    # The previous output is only trusted if it is the file we wrote last
+    # time, built with the same category order.
+    prev_out = index.get("output") or {}
+    usable = (
+        not full
+        and index.get("version") == INDEX_VERSION
+        and index.get("order") == list(category_order)
+        and os.path.exists(output_file)
+        and list(_stat(output_file)) == [prev_out.get("size"), prev_out.get("mtime_ns")]
+    )
+    old_cats = index.get("categories", {}) if usable else {}
+
+    # --- 1. which categories changed ---
+    new_cats = {}
+    changed = set()
+    hashed = 0
+    for category in category_order:
+        path = os.path.join(base_dir, category, "results.json")
+        if not os.path.exists(path):
+            if category in old_cats:
+                changed.add(category)
+            continue
+        size, mtime_ns = _stat(path)
+        old = old_cats.get(category)
+        if old and old["size"] == size and old["mtime_ns"] == mtime_ns:
+            new_cats[category] = old
+            continue
+        with open(path, "rb") as f:
+            digest = _sha256(f.read())
+        hashed += 1
+        if old and old["sha256"] == digest:
+            new_cats[category] = dict(old, size=size, mtime_ns=mtime_ns)
+            continue
+        changed.add(category)
+        new_cats[category] = {"size": size, "mtime_ns": mtime_ns, "sha256": digest, "asins": None}
+    for category in old_cats:
+        if category not in category_order:
+            changed.add(category)
+
+    if usable and not changed:
+        print(f"♻  Merge index: nothing changed in {len(category_order)} categories")
+        if hashed:
+            # touched but identical files: remember the new mtimes
+            index["categories"] = new_cats
+            _write_atomic(index_file, json.dumps(index, indent=2).encode("utf-8"))
+        return {"changed": [], "reparsed": [], "hashed": hashed, "items": len(index.get("origin", {})),
+                "full": False, "seconds": round(time.perf_counter() - start, 3)}
+
+    # --- 2. parse changed categories, then any category that now wins their ASINs ---
+    parsed = {}
+
+    def parse(categories):
+        for category, items in parse_categories(base_dir, categories, workers).items():
+            parsed[category] = items
+            new_cats[category]["asins"] = list(items)
+
+    parse([c for c in category_order if c in changed and c in new_cats])
+
+    affected = set()
+    for category in changed:
+        affected.update((old_cats.get(category) or {}).get("asins") or [])
+        affected.update(parsed.get(category, {}))
+    # An affected ASIN only needs its (possibly new) winning category parsed,
+    # and only if that category didn't already supply it last time.
+    old_origin = index.get("origin", {}) if usable else {}
+    asin_sets = {c: set(e["asins"]) for c, e in new_cats.items() if e["asins"] is not None}
+    winners = set()
+    for asin in affected:
+        winner = next((c for c in category_order if asin in asin_sets.get(c, ())), None)
+        if winner and winner not in parsed and old_origin.get(asin) != winner:
+            winners.add(winner)
+    parse([c for c in category_order if c in winners])
+
+    # --- 3. rebuild in merge order, splicing unchanged items ---
+    old_spans = index.get("spans", {}) if usable else {}
+    previous = b""
+    if usable and any(c not in parsed for c in new_cats):
+        with open(output_file, "rb") as f:
+            previous = f.read()
+
+    texts = []
+    origin = {}
+    for category in category_order:
+        if category not in new_cats:
+            continue
+        fresh = parsed.get(category)
+        for asin in new_cats[category]["asins"]:
+            if asin in origin:
+                continue
+            if fresh is not None:
+                texts.append(fresh[asin])
+            else:
+                offset, length = old_spans[asin]
+                texts.append(previous[offset:offset + length])
+            origin[asin] = category
+
+    data = dump_items(texts)
+    _write_atomic(output_file, data)
+
+    spans = {}
+    offset = 2  # "[\n"
+    for asin, text in zip(origin, texts):
+        spans[asin] = [offset, len(text)]
+        offset += len(text) + 2  # ",\n"
+
+    size, mtime_ns = _stat(output_file)
+    new_index = {
+        "version": INDEX_VERSION,
+        "order": list(category_order),
+        "categories": new_cats,
+        "origin": origin,
+        "spans": spans,
+        "output": {"size": size, "mtime_ns": mtime_ns, "sha256": _sha256(data)},
+    }
+    _write_atomic(index_file, json.dumps(new_index, indent=2).encode("utf-8"))
+
+    stats = {
+        "changed": sorted(changed),
+        "reparsed": [c for c in category_order if c in parsed],
+        "hashed": hashed,
+        "items": len(texts),
+        "full": not usable,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    print(
+        f"🧮 Merge index: {len(stats['changed'])} changed, "
+        f"{len(stats['reparsed'])}/{len(category_order)} re-parsed"
+        + (" (full rebuild)" if not usable else "")
+    )
+    return stats
@@ -0,0 +1,149 @@
+###############################################
+# Incremental normalization (normalized.py)
+###############################################
+# Keeps a sidecar index next to normalized_all_products.json:
+#
+#   asins:    {asin: short hash of the fields normalize reads}
+#   families: [[source_product_url, [asins in order], offset, length], ...]
+#   output:   size / mtime / sha256 of the normalized file we wrote
+#
+# A run hashes every merged item, and only families that are new, lost or
+# gained a member, or have a member whose hash moved are normalized again.
+# Every other family is sliced out of the previous output by its offset
+# and written in the current first-appearance order, so the result
+# matches a full normalize byte for byte.
+#
+# Offer fields that normalize ignores (delivery dates, ...) are not hashed,
+# so a recrawl that only moved those rewrites nothing but the file.
+import hashlib
+import json
+import time
+
+from merge_index import _load_json, _sha256, _stat, _write_atomic, index_path_for
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+# bump when normalized.py changes what it writes for the same input
+INDEX_VERSION = 3
+ITEM_FIELDS = (
+    "asin", "source_product_url", "category", "category_display", "flavor", "title",
+    "price", "price_per_unit", "prime", "size", "variant_dimensions", "final_url",
+    "original_amazon_link", "sold_by", "ships_from",
+)
+OFFER_FIELDS = ("sold_by", "ships_from", "price", "price_per_unit", "seller_rating", "seller_rating_count")
+
+
+def item_hash(item):
+    view = [item.get(k) for k in ITEM_FIELDS]
+    view.append([[o.get(k) for k in OFFER_FIELDS] for o in item.get("other_sellers", [])])
+    data = json.dumps(view, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def group_families(items):
+    """{source_product_url: [items]} in order of first appearance, like normalize_items."""
+    families = {}
+    for p in items:
+        src = p.get("source_product_url")
+        if not p.get("asin") or not src:
+            continue
+        families.setdefault(src, []).append(p)
+    return families
+
+
+def incremental_normalize(items, output_file, index_file=None, full=False, workers=1):
+    """
+    Write normalize_items(items) to `output_file` as json.dump(indent=2)
+    would, re-normalizing only changed families. Returns stats.
+    """
+    from normalized import dump_families, normalize_sharded
+
+    start = time.perf_counter()
+    index_file = index_file or index_path_for(output_file)
+    index = _load_json(index_file, {})
+
+    # The previous output is only trusted if it is the file we wrote last time.
+    prev_out = index.get("output") or {}
+    usable = False
+    if not full and index.get("version") == INDEX_VERSION:
+        try:
+            usable = list(_stat(output_file)) == [prev_out.get("size"), prev_out.get("mtime_ns")]
+        except FileNotFoundError:
+            pass
+    old_hashes = index.get("asins", {}) if usable else {}
+    old_families = {src: (asins, offset, length) for src, asins, offset, length in index.get("families", [])} \
+        if usable else {}
+
+    # --- 1. which families changed ---
+    families = group_families(items)
+    hashes = {}
+    dirty = []
+    for src, members in families.items():
+        asins = [p["asin"] for p in members]
+        changed = False
+        for p in members:
+            h = hashes[p["asin"]] = item_hash(p)
+            if old_hashes.get(p["asin"]) != h:
+                changed = True
+        old = old_families.get(src)
+        if changed or old is None or old[0] != asins:
+            dirty.append(src)
+
+    dropped = sum(1 for src in old_families if src not in families)
+    # clean families can still have moved (first appearance is the output order)
+    reordered = list(families) != [entry[0] for entry in index.get("families", [])]
+    if usable and not dirty and not dropped and not reordered:
+        print(f"♻  Normalize index: nothing changed in {len(families)} families")
+        return {"families": len(families), "renormalized": 0, "dropped": 0, "full": False,
+                "seconds": round(time.perf_counter() - start, 3)}
+
+    # --- 2. normalize the dirty families only ---
+    dirty_set = set(dirty)
+    todo = [p for src in dirty for p in families[src]]
+    # todo keeps each family's items together, so texts come back in `dirty` order
+    fresh = dict(zip(dirty, normalize_sharded(todo, workers, as_json=True)))
+
+    # --- 3. splice into the previous output ---
+    previous = ""
+    if usable and len(dirty_set) < len(families):
+        with open(output_file, "r") as f:
+            previous = f.read()
+    texts = []
+    for src in families:
+        if src in dirty_set:
+            texts.append(fresh[src])
+        else:
+            _, offset, length = old_families[src]
+            texts.append(previous[offset:offset + length])
+
+    data = dump_families(texts)
+    _write_atomic(output_file, data.encode("utf-8"))
+
+    entries = []
+    offset = 2  # "[\n"
+    for src, text in zip(families, texts):
+        entries.append([src, [p["asin"] for p in families[src]], offset, len(text)])
+        offset += len(text) + 2  # ",\n"
+
+    size, mtime_ns = _stat(output_file)
+    new_index = {
+        "version": INDEX_VERSION,
+        "asins": hashes,
+        "families": entries,
+        "output": {"size": size, "mtime_ns": mtime_ns, "sha256": _sha256(data.encode("utf-8"))},
+    }
+    _write_atomic(index_file, json.dumps(new_index).encode("utf-8"))
+
+    stats = {
+        "families": len(families),
+        "renormalized": len(dirty),
+        "dropped": dropped,
+        "full": not usable,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    print(
+        f"🧮 Normalize index: {stats['renormalized']}/{stats['families']} families re-normalized, "
+        f"{dropped} dropped" + (" (full rebuild)" if not usable else "")
+    )
+    return stats
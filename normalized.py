@@ -1,50 +1,76 @@
+import argparse
+import gc
 import json
+import multiprocessing
 import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import lru_cache
 from urllib.parse import urlparse
 
 INPUT_FILE = "all_products_merged.json"
 OUTPUT_FILE = "normalized_all_products.json"
 
+MONEY_RE = re.compile(r"\$([0-9]+(?:\.[0-9]+)?)")
+UNIT_PRICE_RE = re.compile(r"\$([0-9]+(?:\.[0-9]+)?)\s*/")
+RATING_STARS_RE = re.compile(r"(\d+(?:\.\d+)?)\s+out of\s+5")
+RATING_COUNT_RE = re.compile(r"\(([\d,]+)\s+ratings?\)")
+POSITIVE_RE = re.compile(r"(\d+)%\s+positive")
+PACK_OF_RE = re.compile(r"pack\s*(?:of)?\s*(\d+)", re.I)
+PACK_COUNT_RE = re.compile(r"(\d+)\s*(?:count|ct|pieces|pcs)\b", re.I)
+# "12g Protein" is common in titles, so grams only count in the size field
+SIZE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(ounces?|oz|pounds?|lbs?|grams?|g)\b", re.I)
+TITLE_SIZE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(ounces?|oz|pounds?|lbs?)\b", re.I)
+SIZE_UNITS = {"ounce": "oz", "ounces": "oz", "oz": "oz", "pound": "lb", "pounds": "lb",
+              "lb": "lb", "lbs": "lb", "gram": "g", "grams": "g", "g": "g"}
+
 
 # =========================
 # HELPERS
 # =========================
 
+# the same price / rating strings repeat across offers and sellers
+@lru_cache(maxsize=65536)
 def parse_money(m):
     if not m:
         return None
     m = m.replace(",", "")
-    m = re.search(r"\$([0-9]+(?:\.[0-9]+)?)", m)
+    m = MONEY_RE.search(m)
     return float(m.group(1)) if m else None
 
 
+@lru_cache(maxsize=65536)
 def parse_unit_price(text):
     if not text:
         return None
     text = text.replace(",", "")
-    m = re.search(r"\$([0-9]+(?:\.[0-9]+)?)\s*/", text)
+    m = UNIT_PRICE_RE.search(text)
     return float(m.group(1)) if m else parse_money(text)
 
 
+@lru_cache(maxsize=65536)
 def parse_rating_stars(t):
     if not t:
         return None
-    m = re.search(r"(\d+(?:\.\d+)?)\s+out of\s+5", t)
+    m = RATING_STARS_RE.search(t)
     return float(m.group(1)) if m else None
 
 
+@lru_cache(maxsize=65536)
 def parse_rating_meta(t):
     if not t:
         return None, None
     # count
-    c = re.search(r"\(([\d,]+)\s+ratings?\)", t)
+    c = RATING_COUNT_RE.search(t)
     count = int(c.group(1).replace(",", "")) if c else None
     # positive %
-    p = re.search(r"(\d+)%\s+positive", t)
+    p = POSITIVE_RE.search(t)
     positive = float(p.group(1)) if p else None
     return count, positive
 
 
+@lru_cache(maxsize=65536)
 def extract_slug(url):
     if not url:
         return None
@@ -52,6 +78,7 @@ def extract_slug(url):
     return part.replace("-", " ").title()
 
 
+@lru_cache(maxsize=65536)
 def extract_product_family(url):
     try:
         parts = urlparse(url).path.split("/")
@@ -61,6 +88,78 @@ def extract_product_family(url):
         return None
 
 
+# =========================
+# PACK / SIZE
+# =========================
+
+@lru_cache(maxsize=65536)
+def _pack_in_text(txt):
+    m = PACK_OF_RE.search(txt) or PACK_COUNT_RE.search(txt)
+    return max(1, int(m.group(1))) if m else None
+
+
+def parse_pack_count(v):
+    """Items per listing from variant_dimensions, else size / title / names. Defaults to 1."""
+    if not isinstance(v, dict):
+        return 1
+    dims = v.get("variant_dimensions") or {}
+    for key in ("number_of_items", "number_of_items_string", "count", "items"):
+        val = dims.get(key)
+        if val:
+            cleaned = re.sub(r"\D", "", str(val))
+            if cleaned:
+                return max(1, int(cleaned))
+    for txt in (v.get("size"), v.get("title"), v.get("variant_name"), v.get("seller_name")):
+        if not txt:
+            continue
+        pack = _pack_in_text(txt)
+        if pack:
+            return pack
+    return 1
+
+
+def parse_unit_size(size, title=None):
+    """{"value", "unit"} of one unit (oz / lb / g) from the size field, else the title."""
+    for txt, pattern in ((size, SIZE_RE), (title, TITLE_SIZE_RE)):
+        m = pattern.search(txt) if txt else None
+        if m:
+            return {"value": float(m.group(1)), "unit": SIZE_UNITS[m.group(2).lower()]}
+    return None
+
+
+def compute_unit_price(price, pack):
+    """price / pack as a Decimal rounded to 4 places (None if either is unusable)."""
+    try:
+        p = None if price is None else Decimal(str(price))
+    except (InvalidOperation, ValueError, TypeError):
+        return None
+    if p is None or not isinstance(pack, int) or pack <= 0:
+        return None
+    try:
+        return (p / Decimal(pack)).quantize(Decimal("0.0001"), rounding=ROUND_HALF_UP)
+    except Exception:
+        return None
+
+
+def per_item_price(price, pack):
+    """price / pack count as a float: the same unit for variants and offers."""
+    up = compute_unit_price(price, pack)
+    return float(up) if up is not None else None
+
+
+def effective_unit_price(offer):
+    """
+    The metadata summary's unit price for an offer: its declared unit
+    price if positive (per ounce, per count, ... as listed), else price /
+    pack count. Units can differ between offers; use canonical_unit_price
+    to compare them.
+    """
+    declared = offer.get("unit_price")
+    if declared and declared > 0:
+        return declared
+    return per_item_price(offer.get("price"), parse_pack_count(offer))
+
+
 def classify_price_flag(pct):
     """
     Returns a business-friendly price classification based on
@@ -90,10 +189,19 @@ def classify_price_flag(pct):
 # NORMALIZER
 # =========================
 
-def normalize():
-    with open(INPUT_FILE, "r") as f:
-        items = json.load(f)
+def normalize_items(items):
+    """Group merged Amazon items (any iterable) into product families (list of dicts)."""
+    # Millions of small acyclic dicts: cyclic GC passes only cost time here
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _normalize_items(items)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
 
+def _normalize_items(items):
     groups = {}
 
     for p in items:
@@ -137,6 +245,10 @@ def normalize():
             "final_url": p.get("final_url"),
             "original_amazon_link": p.get("original_amazon_link"),
         }
+        pack = parse_pack_count(variant_obj)
+        variant_obj["pack_count"] = pack
+        variant_obj["unit_size"] = parse_unit_size(p.get("size"), p.get("title"))
+        variant_obj["canonical_unit_price"] = per_item_price(base_price, pack)
 
         groups[src]["variants"].append(variant_obj)
 
@@ -153,6 +265,8 @@ def normalize():
             "price_currency": "USD",
             "prime": p.get("prime"),
         }
+        main_seller["canonical_unit_price"] = per_item_price(base_price, pack)
+        main_seller["effective_unit_price"] = effective_unit_price(main_seller)
 
         # Store as list (one per variant)
         if "main_seller" not in groups[src]:
@@ -174,7 +288,7 @@ def normalize():
             delta = (osp - base_price) if (osp and base_price) else None
             pct = ((delta / base_price) * 100) if (delta and base_price) else None
 
-            groups[src]["seller_market"].append({
+            offer = {
                 "asin": asin,
                 "seller_name": osel.get("sold_by"),
                 "ships_from": osel.get("ships_from"),
@@ -194,18 +308,108 @@ def normalize():
                     "mixed" if pos >= 50 else
                     "poor"
                 )
-            })
+            }
+            offer["canonical_unit_price"] = per_item_price(osp, pack)
+            offer["effective_unit_price"] = effective_unit_price(offer)
+            groups[src]["seller_market"].append(offer)
 
     # convert dict → list
-    result = list(groups.values())
+    return list(groups.values())
+
+
+# =========================
+# SHARDED (process pool)
+# =========================
+
+# Shards handed to forked workers by inheritance instead of pickling
+_SHARDS = None
+
+
+def shard_of(src, shards):
+    """Stable partition for a source_product_url (same in every process/run)."""
+    return zlib.crc32(src.encode("utf-8")) % shards
+
+
+def family_json(family):
+    """A family as it appears inside json.dump(result, indent=2)."""
+    return "  " + json.dumps(family, indent=2).replace("\n", "\n  ")
+
+
+def dump_families(texts):
+    """Same bytes as json.dumps(families, indent=2) from family_json texts."""
+    return "[\n" + ",\n".join(texts) + "\n]" if texts else "[]"
+
+
+def _normalize_shard(k, as_json, items=None):
+    families = normalize_items(_SHARDS[k] if items is None else items)
+    if as_json:
+        # serialize in the worker: strings pickle back far cheaper than dicts
+        return [(fam["source_product_url"], family_json(fam)) for fam in families]
+    return [(fam["source_product_url"], fam) for fam in families]
+
+
+def normalize_sharded(items, workers, as_json=False):
+    """
+    normalize_items with items hash-partitioned by source_product_url
+    across `workers` processes. Every family lives in exactly one shard and
+    keeps its items' order there, so putting the families back in order of
+    first appearance gives exactly the serial result.
+
+    With `as_json`, returns each family's JSON text instead (serialized
+    in the workers), ready for dump_families.
+    """
+    global _SHARDS
+    if workers <= 1:
+        result = normalize_items(items)
+        return [family_json(fam) for fam in result] if as_json else result
+
+    shards = [[] for _ in range(workers)]
+    first_seen = {}
+    for p in items:
+        src = p.get("source_product_url")
+        if not p.get("asin") or not src:
+            continue
+        if src not in first_seen:
+            first_seen[src] = len(first_seen)
+        shards[shard_of(src, workers)].append(p)
+
+    fork = "fork" in multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("fork" if fork else None)
+    _SHARDS = shards
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as ex:
+            futures = [
+                ex.submit(_normalize_shard, k, as_json, None if fork else shard)
+                for k, shard in enumerate(shards)
+            ]
+            families = [f for fut in futures for f in fut.result()]
+    finally:
+        _SHARDS = None
+
+    families.sort(key=lambda pair: first_seen[pair[0]])
+    return [fam for _, fam in families]
+
+
+def normalize(input_file=INPUT_FILE, output_file=OUTPUT_FILE, workers=1, full=False):
+    from normalize_index import incremental_normalize
+
+    with open(input_file, "r") as f:
+        items = json.load(f)
 
-    with open(OUTPUT_FILE, "w") as f:
-        json.dump(result, f, indent=2)
+    # only families whose items changed since the last run are re-normalized
+    stats = incremental_normalize(items, output_file, full=full, workers=workers)
 
     print("✔ FINAL Normalization Complete")
-    print("✔ Output:", OUTPUT_FILE)
-    print("✔ Product Families:", len(result))
+    print("✔ Output:", output_file)
+    print("✔ Product Families:", stats["families"])
 
 
 if __name__ == "__main__":
-    normalize()
+    parser = argparse.ArgumentParser(description="Normalize merged Amazon items into product families")
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="shard families by source_product_url across this many processes")
+    parser.add_argument("--full", action="store_true", help="ignore the normalize index and redo every family")
+    args = parser.parse_args()
+    normalize(args.input, args.output, workers=args.workers, full=args.full)
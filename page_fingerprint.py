@@ -0,0 +1,105 @@
+###############################################
+# Change detection for product pages
+###############################################
+# Before the browser opens a product, fetch its HTML over plain HTTP and
+# hash only what decides the Amazon link: product title, hero image and
+# the WTB widget config (widget tag attributes, ps-* meta tags, widget
+# script). If the hash matches the last crawl that found Amazon, and that
+# crawl is younger than the refresh TTL, the old result is reused.
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from resolve_redirects import ConnectionPool
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+FINGERPRINT_FILE = "page_fingerprints.json"
+REFRESH_TTL_DAYS = 14      # re-crawl unchanged pages at least this often
+CHECK_CONCURRENCY = 16
+
+_FLAGS = re.I | re.S
+RELEVANT_PATTERNS = [
+    re.compile(r'<h1[^>]*class="[^"]*pdp-hero__product-name[^"]*"[^>]*>(.*?)</h1>', _FLAGS),
+    re.compile(r'<img[^>]*class="[^"]*pdp-hero-slide__image[^"]*"[^>]*src="([^"]*)"', _FLAGS),
+    re.compile(r'(<[a-z]+[^>]*class="[^"]*ps-widget[^"]*"[^>]*>)', _FLAGS),
+    re.compile(r'(<meta[^>]*name="ps-[^"]*"[^>]*>)', _FLAGS),
+    re.compile(r'<script[^>]*src="([^"]*pricespider[^"]*)"', _FLAGS),
+]
+
+
+def page_fingerprint(html):
+    """sha256 over the relevant fragments, or None if the page has no widget/title."""
+    parts = []
+    for pattern in RELEVANT_PATTERNS:
+        parts.append([" ".join(m.split()) for m in pattern.findall(html)])
+    if not parts[0] and not parts[2]:
+        return None
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+class PageFingerprints:
+    """
+    {product_url: {fingerprint, result, crawled_at, checked_at}} in one
+    JSON file. Only results with an Amazon link are ever reused; missing
+    or failed products are always crawled again.
+    """
+
+    def __init__(self, path=FINGERPRINT_FILE, refresh_ttl_days=REFRESH_TTL_DAYS):
+        self.path = path
+        self.ttl = refresh_ttl_days * 86400
+        self.pool = ConnectionPool()
+        self.entries = {}
+        self.reused = 0
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def fingerprint(self, url):
+        try:
+            status, _, body = self.pool.request("GET", url)
+        except Exception as e:
+            print(f"⚠ Fingerprint fetch failed: {url} → {e}")
+            return None
+        if status != 200:
+            return None
+        return page_fingerprint(body.decode("utf-8", "ignore"))
+
+    def check_all(self, urls, concurrency=CHECK_CONCURRENCY):
+        """Fingerprint many pages at once. Returns {url: fingerprint or None}."""
+        with ThreadPoolExecutor(max_workers=concurrency) as ex:
+            return dict(zip(urls, ex.map(self.fingerprint, urls)))
+
+    def reuse(self, url, fingerprint):
+        """Previous result if the page is unchanged and not due a refresh."""
+        entry = self.entries.get(url)
+        if not fingerprint or not entry or entry["fingerprint"] != fingerprint:
+            return None
+        if not (entry.get("result") or {}).get("amazon"):
+            return None
+        if time.time() - entry["crawled_at"] > self.ttl:
+            return None
+        entry["checked_at"] = round(time.time(), 3)
+        self.reused += 1
+        return entry["result"]
+
+    def record(self, url, fingerprint, result):
+        if not fingerprint:
+            return
+        now = round(time.time(), 3)
+        self.entries[url] = {
+            "fingerprint": fingerprint,
+            "result": result,
+            "crawled_at": now,
+            "checked_at": now,
+        }
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.path)
@@ -51,6 +51,12 @@ def format_price(p):
         return "-" if not p else str(p)
 
 
+def format_unit_size(size):
+    if not size:
+        return "-"
+    return f"{size['value']:g} {size['unit']}"
+
+
 def rating_to_stars(r):
     if r is None:
         return "-"
@@ -165,6 +171,13 @@ def group_same_products(product_list, threshold=0.80):
     groups = []
     used = set()
 
+    # strip pack/size text once per title, not once per pair
+    keys = {}
+    for p in product_list:
+        title = p.get("title") or ""
+        if title not in keys:
+            keys[title] = (extract_identity(title), normalize_title_for_grouping(title))
+
     for p in product_list:
         asin_p = p.get("asin")
         if asin_p in used:
@@ -172,9 +185,7 @@ def group_same_products(product_list, threshold=0.80):
 
         title_p = p.get("title") or ""
         flavor_p = (p.get("flavor") or "").lower().strip()
-        id_p = extract_identity(title_p)
-
-        norm_p = normalize_title_for_grouping(title_p)
+        id_p, norm_p = keys[title_p]
 
         group = {
             "identity": id_p,
@@ -191,7 +202,7 @@ def group_same_products(product_list, threshold=0.80):
 
             title_q = q.get("title") or ""
             flavor_q = (q.get("flavor") or "").lower().strip()
-            id_q = extract_identity(title_q)
+            id_q, norm_q = keys[title_q]
 
             # 1️⃣ Same product identity (self-learned, no hardcoding)
             if id_p != id_q:
@@ -202,7 +213,6 @@ def group_same_products(product_list, threshold=0.80):
                 continue
 
             # 3️⃣ Fuzzy title similarity
-            norm_q = normalize_title_for_grouping(title_q)
             score = fuzzy_ratio(norm_p, norm_q)
 
             if score >= threshold:
@@ -242,6 +252,10 @@ for fam in data_families:
                 "flavor": v.get("variant_name") or v.get("flavor"),
                 "price": v.get("price"),
                 "unit_price": v.get("unit_price"),
+                # precomputed by normalized.py (absent in older files)
+                "pack_count": v.get("pack_count"),
+                "unit_size": v.get("unit_size"),
+                "canonical_unit_price": v.get("canonical_unit_price"),
                 "prime": v.get("prime"),
                 "final_url": v.get("final_url"),
                 "main_seller": main_seller,
@@ -940,6 +954,9 @@ with tab_listing:
                             "title": p.get("title"),
                             "price": format_price(p.get("price")),
                             "unit_price": format_price(p.get("unit_price")),
+                            "pack_count": p.get("pack_count") or "-",
+                            "unit_size": format_unit_size(p.get("unit_size")),
+                            "price_per_item": format_price(p.get("canonical_unit_price")),
                             "prime": "Yes" if p.get("prime") else "No",
                             "flavor": p.get("flavor"),
                             "amazon_url": p.get("final_url") or "-",
@@ -974,10 +991,10 @@ with tab_listing:
                 mp_list = p.get("seller_market") or []
                 if mp_list:
                     st.markdown("**Marketplace Sellers**")
-                    amazon_unit_price = (
-                        p.get("main_seller", {}).get("unit_price")
-                        if p.get("main_seller") else None
-                    )
+                    ms = p.get("main_seller") or {}
+                    amazon_unit_price = ms.get("unit_price")
+                    # per item (price / pack count) on both sides, so deltas compare like units
+                    amazon_per_item = ms.get("canonical_unit_price")
 
                     sellers_table = []
 
@@ -988,6 +1005,12 @@ with tab_listing:
                             if seller_unit_price is not None and amazon_unit_price is not None
                             else "-"
                         )
+                        seller_per_item = s.get("canonical_unit_price")
+                        per_item_delta = (
+                            f"${(seller_per_item - amazon_per_item):.2f}"
+                            if seller_per_item is not None and amazon_per_item is not None
+                            else "-"
+                        )
 
                         sellers_table.append(
                             {
@@ -998,6 +1021,9 @@ with tab_listing:
                                 "seller_unit_price": format_price(seller_unit_price),
                                 "amazon_unit_price": format_price(amazon_unit_price),
                                 "unit_price_delta": unit_price_delta,
+                                "seller_price_per_item": format_price(seller_per_item),
+                                "amazon_price_per_item": format_price(amazon_per_item),
+                                "per_item_delta": per_item_delta,
                                 "price_flag": s.get("price_flag"),
                                 "rating_stars": s.get("rating_stars") or "-",
                                 "rating_count": s.get("rating_count") or "-",
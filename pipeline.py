@@ -0,0 +1,87 @@
+###############################################
+# Merge → normalize → summary in one process
+###############################################
+# Runs amazon_norm.py, normalized.py and amazon_metadata.py back to back
+# without the JSON files in between: merged items are streamed out of the
+# category results.json files, grouped into families and summarized as
+# Python objects. The intermediate files are only written when asked for,
+# and then in the same bytes the standalone scripts produce.
+#
+#   python pipeline.py                                   # summary only
+#   python pipeline.py --write-merged --write-normalized # all three files
+#
+# The normalize index (normalize_index.py) is not used here; a
+# normalized file written by the pipeline just makes the next
+# normalized.py run rebuild in full.
+import argparse
+import json
+import os
+import time
+
+from amazon_metadata import OUTPUT_FILE as SUMMARY_FILE, summarize, write_summary
+from merge_index import merge_order
+from normalized import OUTPUT_FILE as NORMALIZED_FILE, normalize_items
+from stream_merge import iter_merged, peak_rss_mb
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+BASE_DIR = "all_products_3"
+MERGED_FILE = "all_products_merged.json"
+
+
+def tee_json_array(objects, path, ensure_ascii=True):
+    """
+    Pass `objects` through while writing them to `path` as
+    json.dump(list(objects), indent=2) would. Each object is written
+    before it is yielded, so later stages may modify it.
+    """
+    tmp = path + ".tmp"
+    n = 0
+    with open(tmp, "w", encoding="utf-8") as out:
+        out.write("[")
+        for obj in objects:
+            text = json.dumps(obj, indent=2, ensure_ascii=ensure_ascii).replace("\n", "\n  ")
+            out.write(("\n  " if n == 0 else ",\n  ") + text)
+            n += 1
+            yield obj
+        out.write("\n]" if n else "]")
+    os.replace(tmp, path)
+
+
+def run_pipeline(base_dir=BASE_DIR, merged_file=None, normalized_file=None,
+                 summary_file=SUMMARY_FILE):
+    start = time.perf_counter()
+
+    # merge: first item per ASIN, categories in dupicate.py's order
+    items = iter_merged(base_dir, merge_order(base_dir))
+    if merged_file:
+        items = tee_json_array(items, merged_file, ensure_ascii=False)
+
+    # normalize: families need every item, so this stage collects them
+    families = normalize_items(items)
+    if normalized_file:
+        families = tee_json_array(families, normalized_file)
+
+    # summary (lower-cases seller names in place, after they were written)
+    out = summarize(families)
+    write_summary(out, summary_file)
+
+    for label, path in (("merged", merged_file), ("normalized", normalized_file)):
+        if path:
+            print(f"💾 Wrote {label}:", path)
+    print(f"⏱  Pipeline done in {time.perf_counter() - start:.2f}s, peak RSS {peak_rss_mb():.1f} MB")
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge, normalize and summarize without intermediate files")
+    parser.add_argument("--base-dir", default=BASE_DIR)
+    parser.add_argument("--write-merged", nargs="?", const=MERGED_FILE, metavar="PATH",
+                        help=f"also write the merged items (default {MERGED_FILE})")
+    parser.add_argument("--write-normalized", nargs="?", const=NORMALIZED_FILE, metavar="PATH",
+                        help=f"also write the product families (default {NORMALIZED_FILE})")
+    parser.add_argument("--summary", default=SUMMARY_FILE)
+    args = parser.parse_args()
+
+    run_pipeline(args.base_dir, args.write_merged, args.write_normalized, args.summary)
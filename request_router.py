@@ -0,0 +1,197 @@
+import asyncio
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlparse
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+# extract_amazon only reads the hero title, one image src and the WTB widget,
+# so none of these need to be downloaded.
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+TRACKER_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googleadservices.com",
+    "facebook.net",
+    "facebook.com",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "bat.bing.com",
+    "analytics.tiktok.com",
+    "ct.pinterest.com",
+    "snap.licdn.com",
+    "cdn.segment.com",
+    "api.segment.io",
+    "onetrust.com",
+    "cookielaw.org",
+    "quantserve.com",
+    "criteo.com",
+    "adsrvr.org",
+)
+
+# Never block the Where-to-Buy widget (scripts, data, retailer logos).
+ALLOW_HOSTS = ("pricespider.com",)
+
+# Aborted requests never report a size. The router HEADs a sample of the
+# blocked URLs for their Content-Length and extrapolates per resource type
+# from those; EST_BYTES is only the fallback for types with no sample yet.
+SIZE_SAMPLE_EVERY = 10     # HEAD one in N distinct blocked URLs
+SIZE_SAMPLE_MAX = 200      # HEADs per router (worker page) in total
+SIZE_PROBE_TIMEOUT_MS = 3000
+EST_BYTES = {
+    "image": 80_000,
+    "media": 750_000,
+    "font": 45_000,
+    "script": 35_000,
+    "xhr": 2_000,
+    "fetch": 2_000,
+}
+DEFAULT_EST_BYTES = 5_000
+
+_NAV_TIMING_JS = """
+() => {
+  const n = performance.getEntriesByType('navigation')[0];
+  if (!n) return null;
+  return n.loadEventEnd || n.domContentLoadedEventEnd || null;
+}
+"""
+
+
+def _host_matches(host, patterns):
+    return any(host == p or host.endswith("." + p) for p in patterns)
+
+
+class RequestRouter:
+    """
+    page.route() filter that aborts images/media/fonts and tracker hosts
+    while letting the WTB widget through. Counters are per product:
+    call reset() before a product and finish() after it.
+
+    Saved bytes: blocked URLs whose size was sampled (HEAD Content-Length)
+    count exactly ("bytes_saved_measured"); the rest are extrapolated from
+    the sampled mean of their resource type, or EST_BYTES without one.
+    "bytes_saved_est" is the total of both.
+    """
+
+    def __init__(
+        self,
+        block_types=BLOCKED_RESOURCE_TYPES,
+        tracker_hosts=TRACKER_HOSTS,
+        allow_hosts=ALLOW_HOSTS,
+        reports=None,
+    ):
+        self.block_types = set(block_types)
+        self.tracker_hosts = tuple(tracker_hosts)
+        self.allow_hosts = tuple(allow_hosts)
+        self.reports = reports if reports is not None else []
+        self.sizes = {}                       # url -> Content-Length (None = unknown)
+        self.type_sizes = defaultdict(list)   # resource type -> sampled sizes
+        self._seen = 0
+        self._probes = set()
+        self._api = None
+        self.reset()
+
+    async def install(self, page):
+        self._api = page.context.request
+        await page.route("**/*", self._handle)
+
+    def reset(self):
+        self.blocked = Counter()
+        self.allowed = 0
+        self.blocked_urls = []                # (url, resource type)
+        self._started = time.perf_counter()
+
+    def _maybe_sample(self, url, rtype):
+        if url in self.sizes or self._api is None or not url.startswith("http"):
+            return
+        self._seen += 1
+        if (self._seen - 1) % SIZE_SAMPLE_EVERY or len(self.sizes) >= SIZE_SAMPLE_MAX:
+            return
+        self.sizes[url] = None
+        task = asyncio.ensure_future(self._probe(url, rtype))
+        self._probes.add(task)
+        task.add_done_callback(self._probes.discard)
+
+    async def _probe(self, url, rtype):
+        try:
+            resp = await self._api.head(url, timeout=SIZE_PROBE_TIMEOUT_MS)
+            length = int(resp.headers.get("content-length", ""))
+        except Exception:
+            return
+        self.sizes[url] = length
+        self.type_sizes[rtype].append(length)
+
+    def bytes_saved(self):
+        """(measured, estimated total) for the current product's blocked requests."""
+        measured = estimated = 0
+        for url, rtype in self.blocked_urls:
+            size = self.sizes.get(url)
+            if size is not None:
+                measured += size
+                continue
+            sample = self.type_sizes.get(rtype)
+            estimated += sum(sample) // len(sample) if sample else EST_BYTES.get(rtype, DEFAULT_EST_BYTES)
+        return measured, measured + estimated
+
+    def block_reason(self, request):
+        host = urlparse(request.url).hostname or ""
+        if _host_matches(host, self.allow_hosts):
+            return None
+        if _host_matches(host, self.tracker_hosts):
+            return "tracker"
+        if request.resource_type in self.block_types:
+            return request.resource_type
+        return None
+
+    async def _handle(self, route):
+        request = route.request
+        reason = self.block_reason(request)
+        if reason:
+            self.blocked[reason] += 1
+            self.blocked_urls.append((request.url, request.resource_type))
+            self._maybe_sample(request.url, request.resource_type)
+            await route.abort()
+        else:
+            self.allowed += 1
+            await route.continue_()
+
+    async def finish(self, page, product_url):
+        """Close out the current product and return its report."""
+        try:
+            load_ms = await page.evaluate(_NAV_TIMING_JS)
+        except Exception:
+            load_ms = None
+        if self._probes:
+            await asyncio.wait(set(self._probes), timeout=SIZE_PROBE_TIMEOUT_MS / 1000)
+        measured, total = self.bytes_saved()
+
+        report = {
+            "product_url": product_url,
+            "page_load_ms": round(load_ms, 1) if load_ms else None,
+            "extract_ms": round((time.perf_counter() - self._started) * 1000, 1),
+            "requests_allowed": self.allowed,
+            "requests_blocked": sum(self.blocked.values()),
+            "blocked_by_reason": dict(self.blocked),
+            "bytes_saved_measured": measured,
+            "bytes_saved_est": total,
+        }
+        self.reports.append(report)
+        return report
+
+
+def summarize(reports):
+    if not reports:
+        return {}
+    loads = sorted(r["page_load_ms"] for r in reports if r["page_load_ms"])
+    return {
+        "products": len(reports),
+        "requests_blocked": sum(r["requests_blocked"] for r in reports),
+        "bytes_saved_measured": sum(r["bytes_saved_measured"] for r in reports),
+        "bytes_saved_est": sum(r["bytes_saved_est"] for r in reports),
+        "avg_page_load_ms": round(sum(loads) / len(loads), 1) if loads else None,
+        "max_page_load_ms": loads[-1] if loads else None,
+    }
@@ -0,0 +1,253 @@
+###############################################
+# PriceSpider redirect → Amazon ASIN resolver (HTTP only)
+###############################################
+# products/*.json keep `amazon_link` as redir.pricespider.com/redirect/?...
+# URLs. This follows the redirect chain with plain HTTP (HEAD first, GET
+# only when a hop needs it), stops at the first Amazon URL, and writes the
+# ASIN back next to each product — no Chromium involved.
+#
+#   python resolve_redirects.py            # resolve products/*.json
+#   python resolve_redirects.py --bench    # throughput vs local stand-in
+import argparse
+import glob
+import http.client
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+PRODUCTS_GLOB = "products/*.json"
+CONCURRENCY = 16
+MAX_HOPS = 8
+TIMEOUT = 15
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+ASIN_RE = re.compile(r"/(?:dp|gp/product|gp/aw/d|exec/obidos/ASIN)/([A-Z0-9]{10})(?:[/?#]|$)")
+# Some redirect pages hop via meta refresh / JS instead of a Location header
+BODY_URL_RE = re.compile(
+    r"""(?:http-equiv=["']?refresh["']?[^>]*url=|location(?:\.href)?\s*=\s*["'])([^"'>\s]+)""",
+    re.I,
+)
+
+
+def extract_asin(url):
+    if not url:
+        return None
+    m = ASIN_RE.search(urlparse(url).path + "/")
+    return m.group(1) if m else None
+
+
+def is_amazon(url):
+    host = urlparse(url).hostname or ""
+    return host == "amazon.com" or host.endswith(".amazon.com")
+
+
+# ---------------------------------------------------------
+# KEEP-ALIVE CONNECTION POOL
+# ---------------------------------------------------------
+class ConnectionPool:
+    """
+    One persistent http.client connection per (thread, scheme, host, port),
+    so every worker thread reuses its sockets across redirects and links.
+    """
+
+    def __init__(self, timeout=TIMEOUT):
+        self.timeout = timeout
+        self._local = threading.local()
+        self.opened = 0
+        # every connection any thread opened, so close() can reach them all
+        self._all = []
+        self._lock = threading.Lock()
+
+    def _conn(self, scheme, host, port):
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        key = (scheme, host, port)
+        conn = conns.get(key)
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = conns[key] = cls(host, port, timeout=self.timeout)
+            with self._lock:
+                self.opened += 1
+                self._all.append(conn)
+        return conn
+
+    def _drop(self, scheme, host, port):
+        conn = self._local.conns.pop((scheme, host, port), None)
+        if conn:
+            conn.close()
+            with self._lock:
+                if conn in self._all:
+                    self._all.remove(conn)
+
+    def request(self, method, url):
+        """Returns (status, headers, body). Body is b"" for HEAD."""
+        u = urlparse(url)
+        scheme = u.scheme or "http"
+        port = u.port or (443 if scheme == "https" else 80)
+        path = (u.path or "/") + (f"?{u.query}" if u.query else "")
+        headers = {"User-Agent": USER_AGENT, "Accept": "*/*", "Connection": "keep-alive"}
+
+        for attempt in (1, 2):
+            conn = self._conn(scheme, u.hostname, port)
+            try:
+                conn.request(method, path, headers=headers)
+                resp = conn.getresponse()
+                body = resp.read()
+                if resp.getheader("Connection", "").lower() == "close":
+                    self._drop(scheme, u.hostname, port)
+                return resp.status, {k.lower(): v for k, v in resp.getheaders()}, body
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError,
+                    http.client.CannotSendRequest, http.client.ResponseNotReady):
+                # stale keep-alive socket: reconnect once
+                self._drop(scheme, u.hostname, port)
+                if attempt == 2:
+                    raise
+
+    def close(self):
+        """Close the connections of every worker thread, not just the caller's."""
+        with self._lock:
+            conns, self._all = self._all, []
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
+
+
+# ---------------------------------------------------------
+# RESOLVER
+# ---------------------------------------------------------
+def resolve(pool, url, max_hops=MAX_HOPS):
+    """
+    Follow `url` until an ASIN shows up. Returns
+    {"asin", "amazon_url", "hops", "gets", "error"}.
+    """
+    out = {"asin": None, "amazon_url": None, "hops": 0, "gets": 0, "error": None}
+    current = url
+    try:
+        for _ in range(max_hops):
+            asin = extract_asin(current) if is_amazon(current) else None
+            if asin:
+                out.update(asin=asin, amazon_url=current)
+                return out
+
+            status, headers, _ = pool.request("HEAD", current)
+            location = headers.get("location")
+            if status in (405, 501) or (200 <= status < 300 and not location):
+                # HEAD not allowed or the hop is an HTML/JS redirect page
+                status, headers, body = pool.request("GET", current)
+                out["gets"] += 1
+                location = headers.get("location")
+                if not location and status == 200:
+                    m = BODY_URL_RE.search(body.decode("utf-8", "ignore"))
+                    location = m.group(1) if m else None
+
+            if not location:
+                out["error"] = f"dead end (HTTP {status})"
+                break
+
+            current = urljoin(current, location)
+            out["hops"] += 1
+        else:
+            out["error"] = "too many hops"
+
+        asin = extract_asin(current)
+        if asin:
+            out.update(asin=asin, amazon_url=current, error=None)
+    except Exception as e:
+        out["error"] = str(e)
+    return out
+
+
+def resolve_all(urls, concurrency=CONCURRENCY, pool=None):
+    """Resolve unique `urls` on a thread pool. Returns (results, stats)."""
+    unique = list(dict.fromkeys(u for u in urls if u))
+    pool = pool or ConnectionPool()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        resolved = dict(zip(unique, ex.map(lambda u: resolve(pool, u), unique)))
+    elapsed = time.perf_counter() - start
+
+    ok = sum(1 for r in resolved.values() if r["asin"])
+    stats = {
+        "links": len(unique),
+        "resolved": ok,
+        "failed": len(unique) - ok,
+        "seconds": round(elapsed, 3),
+        "resolutions_per_sec": round(len(unique) / elapsed, 1) if elapsed else None,
+        "connections_opened": pool.opened,
+        "get_fallbacks": sum(r["gets"] for r in resolved.values()),
+    }
+    return resolved, stats
+
+
+def resolve_products(pattern=PRODUCTS_GLOB, concurrency=CONCURRENCY, force=False):
+    """Add `asin` + `amazon_url` next to each product's `amazon_link`."""
+    files = sorted(glob.glob(pattern))
+    data = {}
+    for path in files:
+        with open(path, "r", encoding="utf-8") as f:
+            data[path] = json.load(f)
+
+    todo = [
+        p["amazon_link"]
+        for items in data.values()
+        for p in items
+        if isinstance(p.get("amazon_link"), str) and (force or not p.get("asin"))
+    ]
+    print(f"🔗 {len(set(todo))} redirect links to resolve across {len(files)} files")
+    resolved, stats = resolve_all(todo, concurrency)
+
+    for path, items in data.items():
+        changed = False
+        for p in items:
+            r = resolved.get(p.get("amazon_link"))
+            if r and r["asin"]:
+                p["asin"] = r["asin"]
+                p["amazon_url"] = r["amazon_url"]
+                changed = True
+            elif r:
+                print(f"⚠ {os.path.basename(path)}: {p.get('product_url')} → {r['error']}")
+        if changed:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(items, f, indent=2, ensure_ascii=False)
+
+    print("✔ Resolver:", json.dumps(stats))
+    return stats
+
+
+def bench(n=500, concurrency=CONCURRENCY):
+    """Resolve `n` stand-in redirect links and report resolutions/sec."""
+    from standin_server import StandinServer
+
+    with StandinServer(port=0, redirect_to_amazon=True) as srv:
+        urls = [f"{srv.base_url}/redirect/?asin=B{i:09d}&n={i}" for i in range(n)]
+        resolved, stats = resolve_all(urls, concurrency)
+        bad = [u for u, r in resolved.items() if r["asin"] != f"B{int(u.rsplit('=', 1)[1]):09d}"]
+    stats["wrong_asin"] = len(bad)
+    print("✔ Bench:", json.dumps(stats))
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resolve PriceSpider redirects to Amazon ASINs")
+    parser.add_argument("--glob", default=PRODUCTS_GLOB)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--force", action="store_true", help="re-resolve products that already have an asin")
+    parser.add_argument("--bench", type=int, nargs="?", const=500, help="resolve N stand-in links instead")
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(args.bench, args.concurrency)
+    else:
+        resolve_products(args.glob, args.concurrency, args.force)
@@ -0,0 +1,186 @@
+###############################################
+# Keyed diff between two crawl generations
+###############################################
+# Streams both generations keyed by ASIN and compares short per-field
+# hashes of the fields that matter downstream:
+#
+#   price, price_per_unit, sold_by, other_sellers
+#
+# other_sellers is hashed on its offers (seller, price, unit price,
+# ships from) only — delivery dates and rating counts change on every
+# crawl. Three linear passes: hash the old side, compare the new side,
+# then re-read the old side for just the changed ASINs' values.
+#
+#   python snapshot_diff.py all_products_1 all_products_3
+#   python snapshot_diff.py old.ndjson all_products_merged.json --output diff.json
+import argparse
+import hashlib
+import json
+import os
+import time
+
+from merge_index import merge_order
+from stream_merge import iter_json_array, iter_merged, iter_ndjson
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+DIFF_FIELDS = ("price", "price_per_unit", "sold_by", "other_sellers")
+OFFER_FIELDS = ("sold_by", "price", "price_per_unit", "ships_from")
+OUTPUT_FILE = "snapshot_diff.json"
+
+
+def iter_generation(source):
+    """First item per ASIN from a snapshot dir, a merged .json or an .ndjson file."""
+    if os.path.isdir(source):
+        yield from iter_merged(source, merge_order(source))
+        return
+    items = iter_ndjson(source) if source.endswith(".ndjson") else iter_json_array(source)
+    seen = set()
+    for item in items:
+        asin = item.get("asin")
+        if asin and asin not in seen:
+            seen.add(asin)
+            yield item
+
+
+def _offer_sort_key(view):
+    return json.dumps(view, sort_keys=True, ensure_ascii=False)
+
+
+def offers(item):
+    """
+    {(seller, ships from): [offer views]} for other_sellers, without the
+    volatile fields. One seller can list several offers (new / used,
+    different fulfilment), so every offer is kept, in a stable order.
+    """
+    out = {}
+    for offer in item.get("other_sellers") or []:
+        view = {k: offer.get(k) for k in OFFER_FIELDS}
+        out.setdefault((view["sold_by"] or "?", view["ships_from"] or ""), []).append(view)
+    for views in out.values():
+        views.sort(key=_offer_sort_key)
+    return out
+
+
+def _field_value(item, field):
+    if field == "other_sellers":
+        return sorted(([*key], views) for key, views in offers(item).items())
+    return item.get(field)
+
+
+def _hash(value):
+    data = json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def field_hashes(item):
+    return tuple(_hash(_field_value(item, f)) for f in DIFF_FIELDS)
+
+
+def diff_offers(old_item, new_item):
+    """
+    Offers matched on (seller, ships from). Identical offers cancel out;
+    what is left pairs up as changed, the surplus is added / removed.
+    """
+    old, new = offers(old_item), offers(new_item)
+    out = {"added": [], "removed": [], "changed": []}
+    for key in list(new) + [k for k in old if k not in new]:
+        before, after = list(old.get(key, [])), []
+        for view in new.get(key, []):
+            if view in before:
+                before.remove(view)
+            else:
+                after.append(view)
+        for a, b in zip(before, after):
+            out["changed"].append({"sold_by": key[0], "old": a, "new": b})
+        out["removed"] += before[len(after):]
+        out["added"] += after[len(before):]
+    return out
+
+
+def diff_generations(old_source, new_source):
+    start = time.perf_counter()
+
+    # pass 1: hash the old side
+    old_hashes = {item["asin"]: field_hashes(item) for item in iter_generation(old_source)}
+
+    # pass 2: compare the new side
+    added, changed, new_items = [], {}, {}
+    seen = set()
+    for item in iter_generation(new_source):
+        asin = item["asin"]
+        seen.add(asin)
+        hashes = field_hashes(item)
+        before = old_hashes.get(asin)
+        if before is None:
+            added.append(asin)
+        elif before != hashes:
+            changed[asin] = [f for f, a, b in zip(DIFF_FIELDS, before, hashes) if a != b]
+            new_items[asin] = {f: item.get(f) for f in DIFF_FIELDS}
+    removed = [asin for asin in old_hashes if asin not in seen]
+
+    # pass 3: old values for the changed ASINs only
+    report = {}
+    for item in iter_generation(old_source):
+        asin = item["asin"]
+        if asin not in changed:
+            continue
+        new = new_items[asin]
+        entry = {"fields": changed[asin]}
+        for field in changed[asin]:
+            if field == "other_sellers":
+                entry["offers"] = diff_offers(item, new)
+            else:
+                entry[field] = {"old": item.get(field), "new": new[field]}
+        report[asin] = entry
+
+    return {
+        "old": old_source,
+        "new": new_source,
+        "added": added,
+        "removed": removed,
+        "changed": {asin: report[asin] for asin in changed},
+        "unchanged": len(seen) - len(added) - len(changed),
+        "renormalize": sorted(added + list(changed)),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def print_summary(diff):
+    by_field = {f: 0 for f in DIFF_FIELDS}
+    for entry in diff["changed"].values():
+        for f in entry["fields"]:
+            by_field[f] += 1
+    print(
+        f"🆚 {diff['old']} → {diff['new']}: +{len(diff['added'])} added, "
+        f"-{len(diff['removed'])} removed, ~{len(diff['changed'])} changed, "
+        f"{diff['unchanged']} unchanged ({diff['seconds']}s)"
+    )
+    print("   changed fields:", json.dumps(by_field))
+    for asin, entry in list(diff["changed"].items())[:10]:
+        parts = []
+        if "price" in entry:
+            parts.append(f"price {entry['price']['old']} → {entry['price']['new']}")
+        if "sold_by" in entry:
+            parts.append(f"sold by {entry['sold_by']['old']} → {entry['sold_by']['new']}")
+        if "offers" in entry:
+            o = entry["offers"]
+            parts.append(f"offers +{len(o['added'])} -{len(o['removed'])} ~{len(o['changed'])}")
+        if "price_per_unit" in entry and "price" not in entry:
+            parts.append("unit price")
+        print(f"   {asin}: " + ", ".join(parts))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-ASIN diff between two crawl generations")
+    parser.add_argument("old", help="snapshot dir, merged .json or .ndjson")
+    parser.add_argument("new", help="snapshot dir, merged .json or .ndjson")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    diff = diff_generations(args.old, args.new)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(diff, f, indent=2, ensure_ascii=False)
+    print_summary(diff)
+    print("💾 Saved:", args.output)
@@ -0,0 +1,261 @@
+###############################################
+# K-way merge across crawl generations
+###############################################
+# Merges N snapshot directories (all_products_1, all_products_3, next
+# week's ...) in one linear pass. Each <snapshot>/<Category>/results.json
+# is turned once into an ASIN-sorted run file under merge_runs/ (reused
+# while the source is unchanged), then all runs are merged with a heap:
+#
+#   key = (asin, snapshot rank, category rank)
+#
+# so the first entry of each ASIN group is the winner: the highest
+# precedence snapshot, and inside it dupicate.py's category order. Only
+# winners are decoded. Every output item carries its `snapshot` and a
+# `provenance` list of every snapshot/category that had the ASIN.
+#
+# Precedence is the order given (DEFAULT_SNAPSHOTS is newest first), or
+# by crawl time with --order newest/oldest. The crawl time comes from a
+# <snapshot>/crawled_at.txt marker; without one the newest results.json
+# mtime is used, and the merge refuses to run when two snapshots tie
+# (a fresh checkout gives every file the same mtime).
+#
+#   python snapshot_merge.py                                   # all_products_3 > all_products_1
+#   python snapshot_merge.py --snapshots all_products_3 all_products_1 next_week --order newest
+#   python snapshot_merge.py --mark-crawled all_products_3 2025-12-15
+import argparse
+import hashlib
+import heapq
+import json
+import os
+import time
+from datetime import datetime
+
+from merge_index import ALL_CATEGORY, merge_order
+from stream_merge import iter_json_array
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+DEFAULT_SNAPSHOTS = ("all_products_3", "all_products_1")  # newest first
+CRAWLED_AT_FILE = "crawled_at.txt"  # ISO date/time of the crawl, one line
+RUNS_DIR = "merge_runs"
+OUTPUT_FILE = "all_products_snapshots.ndjson"
+
+
+def snapshot_name(snapshot):
+    return os.path.basename(os.path.normpath(snapshot))
+
+
+def snapshot_mtime(snapshot):
+    """Newest results.json in a snapshot (its crawl time, roughly)."""
+    newest = 0
+    for category in os.listdir(snapshot):
+        path = os.path.join(snapshot, category, "results.json")
+        if os.path.exists(path):
+            newest = max(newest, os.stat(path).st_mtime)
+    return newest
+
+
+def snapshot_time(snapshot):
+    """(crawl time, source): the crawled_at.txt marker, else the mtime."""
+    marker = os.path.join(snapshot, CRAWLED_AT_FILE)
+    if os.path.exists(marker):
+        with open(marker, "r", encoding="utf-8") as f:
+            return datetime.fromisoformat(f.read().strip()).timestamp(), "marker"
+    return snapshot_mtime(snapshot), "mtime"
+
+
+def mark_crawled(snapshot, when=None):
+    """Write the crawled_at.txt marker (default: now)."""
+    when = when or datetime.now().isoformat(timespec="seconds")
+    datetime.fromisoformat(when)  # reject typos before writing
+    with open(os.path.join(snapshot, CRAWLED_AT_FILE), "w", encoding="utf-8") as f:
+        f.write(when + "\n")
+    print(f"📅 {snapshot}: crawled at {when}")
+
+
+def snapshot_labels(snapshots):
+    """{snapshot: label}: the directory name, or the path where names clash."""
+    names = [snapshot_name(s) for s in snapshots]
+    return {s: n if names.count(n) == 1 else os.path.normpath(s) for s, n in zip(snapshots, names)}
+
+
+def run_key(snapshot):
+    """Run subdirectory for a snapshot: its name plus a hash of its absolute
+    path, so same-named snapshots in different parents don't share runs."""
+    path = os.path.abspath(snapshot).encode("utf-8")
+    return f"{snapshot_name(snapshot)}-{hashlib.blake2b(path, digest_size=6).hexdigest()}"
+
+
+def order_snapshots(snapshots, order="given"):
+    """
+    Precedence list, highest first. order: given | newest | oldest.
+    Raises ValueError when two snapshots have the same crawl time, since
+    the result would depend on the order they were listed in.
+    """
+    if order == "given":
+        return list(snapshots)
+    times = {s: snapshot_time(s) for s in snapshots}
+    fallback = [s for s, (_, source) in times.items() if source == "mtime"]
+    if fallback:
+        print(f"⚠️  No {CRAWLED_AT_FILE} in {', '.join(fallback)}; ordering by results.json mtime")
+    seen = {}
+    for s, (ts, _) in times.items():
+        if ts in seen:
+            raise ValueError(
+                f"{seen[ts]} and {s} have the same crawl time; add {CRAWLED_AT_FILE} "
+                f"markers (--mark-crawled) or list them newest first with --order given"
+            )
+        seen[ts] = s
+    return sorted(snapshots, key=lambda s: times[s][0], reverse=(order == "newest"))
+
+
+# ---------------------------------------------------------
+# SORTED RUNS
+# ---------------------------------------------------------
+def build_run(snapshot, category, runs_dir=RUNS_DIR):
+    """
+    <runs_dir>/<run_key>/<category>.run: one "asin<TAB>item json" line per
+    ASIN (first occurrence in the file), sorted by ASIN. Returns
+    (path, built) — built is False when the cached run was still valid.
+    """
+    src = os.path.join(snapshot, category, "results.json")
+    dst = os.path.join(runs_dir, run_key(snapshot), category + ".run")
+    st = os.stat(src)
+    source = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    meta_path = dst + ".src"
+    if os.path.exists(dst) and os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            if json.load(f) == source:
+                return dst, False
+
+    rows = {}
+    for item in iter_json_array(src):
+        asin = item.get("asin")
+        if asin and asin not in rows:
+            rows[asin] = json.dumps(item, ensure_ascii=False)
+
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    with open(dst + ".tmp", "w", encoding="utf-8") as f:
+        for asin in sorted(rows):
+            f.write(f"{asin}\t{rows[asin]}\n")
+    os.replace(dst + ".tmp", dst)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(source, f)
+    return dst, True
+
+
+def iter_run(path, snapshot_rank, category_rank, label):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            asin, _, payload = line.rstrip("\n").partition("\t")
+            yield asin, snapshot_rank, category_rank, label, payload
+
+
+# ---------------------------------------------------------
+# K-WAY MERGE
+# ---------------------------------------------------------
+def kway_merge(snapshots, runs_dir=RUNS_DIR, stats=None):
+    """
+    Yield one item per ASIN, in ASIN order, from `snapshots` (highest
+    precedence first). A winner from All_Snacks keeps the first real
+    category any snapshot has for that ASIN, like dupicate.py intends.
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("runs_built", 0)
+    stats.setdefault("runs_reused", 0)
+
+    labels = snapshot_labels(snapshots)
+    runs = []
+    for s_rank, snapshot in enumerate(snapshots):
+        for c_rank, category in enumerate(merge_order(snapshot)):
+            if not os.path.exists(os.path.join(snapshot, category, "results.json")):
+                continue
+            path, built = build_run(snapshot, category, runs_dir)
+            stats["runs_built" if built else "runs_reused"] += 1
+            label = (labels[snapshot], category)
+            runs.append(iter_run(path, s_rank, c_rank, label))
+
+    def finish(winner, payload, provenance):
+        item = json.loads(payload)
+        snap, category = winner
+        if category == ALL_CATEGORY:
+            category = next((c for _, c in provenance if c != ALL_CATEGORY), category)
+        item["category"] = category
+        item["snapshot"] = snap
+        item["provenance"] = [f"{s}/{c}" for s, c in provenance]
+        return item
+
+    current = None
+    for asin, _, _, label, payload in heapq.merge(*runs):
+        if asin != current:
+            if current is not None:
+                yield finish(winner, winner_payload, provenance)
+            current, winner, winner_payload, provenance = asin, label, payload, [label]
+        else:
+            provenance.append(label)
+    if current is not None:
+        yield finish(winner, winner_payload, provenance)
+
+
+def merge_snapshots(snapshots=DEFAULT_SNAPSHOTS, order="given", output_file=OUTPUT_FILE,
+                    runs_dir=RUNS_DIR, as_json=False):
+    start = time.perf_counter()
+    ranked = order_snapshots(snapshots, order)
+    labels = snapshot_labels(ranked)
+    print("🗂  Precedence:", " > ".join(labels[s] for s in ranked))
+
+    stats = {}
+    wins = {labels[s]: 0 for s in ranked}
+    shared = 0
+    tmp = output_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as out:
+        if as_json:
+            out.write("[")
+        for n, item in enumerate(kway_merge(ranked, runs_dir, stats)):
+            wins[item["snapshot"]] += 1
+            if len({p.rsplit("/", 1)[0] for p in item["provenance"]}) > 1:
+                shared += 1
+            if as_json:
+                out.write(("\n" if n == 0 else ",\n") + json.dumps(item, indent=2, ensure_ascii=False))
+            else:
+                out.write(json.dumps(item, ensure_ascii=False) + "\n")
+        if as_json:
+            out.write("\n]" if sum(wins.values()) else "]")
+    os.replace(tmp, output_file)
+
+    stats.update(
+        items=sum(wins.values()),
+        wins=wins,
+        in_several_snapshots=shared,
+        seconds=round(time.perf_counter() - start, 3),
+    )
+    print(
+        f"🔀 {stats['items']} ASINs from {len(ranked)} snapshots → {output_file} "
+        f"({stats['runs_built']} runs built, {stats['runs_reused']} reused, {stats['seconds']}s)"
+    )
+    print("   winners:", json.dumps(wins), f"| in >1 snapshot: {shared}")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge several crawl snapshots per ASIN")
+    parser.add_argument("--snapshots", nargs="+", default=list(DEFAULT_SNAPSHOTS))
+    parser.add_argument("--order", choices=("given", "newest", "oldest"), default="given",
+                        help="precedence: as listed (highest first), or by crawl time")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--runs-dir", default=RUNS_DIR)
+    parser.add_argument("--json", action="store_true", help="write a JSON array instead of NDJSON")
+    parser.add_argument("--mark-crawled", nargs="+", metavar=("SNAPSHOT", "WHEN"),
+                        help="write SNAPSHOT's crawl time marker (WHEN: ISO date, default now) and exit")
+    args = parser.parse_args()
+
+    if args.mark_crawled:
+        mark_crawled(*args.mark_crawled[:2])
+    else:
+        try:
+            merge_snapshots(args.snapshots, args.order, args.output, args.runs_dir, args.json)
+        except ValueError as e:
+            print(f"❌ {e}")
+            raise SystemExit(1)
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import time
+
+from waits import is_wtb_response
+from wtb_capture import find_amazon_link
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+SNAPSHOT_DIR = "snapshots"
+MAX_RESPONSE_BYTES = 2_000_000
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class SnapshotStore:
+    """
+    Content-addressed page snapshots:
+
+        <root>/objects/<aa>/<sha256>   DOM + response bodies, deduped
+        <root>/index.json              product_url → manifest
+
+    A manifest holds the DOM hash, the widget's responses (url, status,
+    content type, body hash), the URLs popups navigated to, the live
+    result and the capture time.
+    """
+
+    def __init__(self, root=SNAPSHOT_DIR):
+        self.root = root
+        self.index_path = os.path.join(root, "index.json")
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def put_blob(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        digest = sha256(data)
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return digest
+
+    def get_blob(self, digest):
+        with open(self._object_path(digest), "rb") as f:
+            return f.read()
+
+    def get_text(self, digest):
+        return self.get_blob(digest).decode("utf-8", "ignore")
+
+    def save(self, product_url, category, dom, responses, result, popups=()):
+        manifest = {
+            "product_url": product_url,
+            "category": category,
+            "captured_at": round(time.time(), 3),
+            "dom": self.put_blob(dom),
+            "responses": [
+                {
+                    "url": r["url"],
+                    "status": r["status"],
+                    "content_type": r["content_type"],
+                    "body": self.put_blob(r["body"]),
+                }
+                for r in responses
+            ],
+            "popups": list(popups),
+            "result": result,
+        }
+        self.index[product_url] = manifest
+        return manifest
+
+    def payload_link(self, manifest):
+        """Amazon link from the recorded widget payloads, or None."""
+        for resp in manifest["responses"]:
+            if "json" not in resp["content_type"]:
+                continue
+            try:
+                link = find_amazon_link(json.loads(self.get_text(resp["body"])))
+            except ValueError:
+                continue
+            if link:
+                return link
+        return None
+
+    def items(self):
+        return list(self.index.items())
+
+    def flush(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.index_path)
+
+
+def popup_link(manifest):
+    """Where the last recorded popup (a click-path buy button) navigated to."""
+    popups = [u for u in manifest.get("popups") or () if u and u != "about:blank"]
+    return popups[-1] if popups else None
+
+
+class SnapshotRecorder:
+    """Buffers one page's WTB responses and popup URLs until the product is saved."""
+
+    def __init__(self, page):
+        self.page = page
+        self.responses = []
+        self.popups = []
+        page.on("response", self._on_response)
+        page.on("popup", self._on_popup)
+
+    def _on_popup(self, popup):
+        index = len(self.popups)
+        self.popups.append(popup.url)
+
+        def on_navigated(frame):
+            if frame == popup.main_frame:
+                self.popups[index] = frame.url
+
+        popup.on("framenavigated", on_navigated)
+
+    async def _on_response(self, response):
+        if not is_wtb_response(response):
+            return
+        try:
+            body = await response.body()
+        except Exception:
+            return
+        if len(body) > MAX_RESPONSE_BYTES:
+            return
+        self.responses.append({
+            "url": response.url,
+            "status": response.status,
+            "content_type": response.headers.get("content-type") or "",
+            "body": body,
+        })
+
+    async def save(self, store, product_url, category, result):
+        self.page.remove_listener("response", self._on_response)
+        self.page.remove_listener("popup", self._on_popup)
+        try:
+            dom = await self.page.content()
+        except Exception:
+            dom = ""
+        return store.save(product_url, category, dom, self.responses, result, self.popups)
@@ -0,0 +1,204 @@
+###############################################
+# Per-step timing spans for extract_amazon
+###############################################
+# Each product gets a ProductTrace; the scraper wraps goto / widget open /
+# ZIP search / popup capture in trace.span(...). When the product finishes
+# its spans are appended to a JSONL file, one line per span, all tagged
+# with the product URL, the ZIP that hit and the detection method.
+#
+#   python cat.py --all --trace                    # write crawl_trace.jsonl
+#   python span_trace.py                           # per-step percentiles
+#   python span_trace.py --by method               # ... split by method
+import argparse
+import json
+import os
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+from waits import percentile
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+TRACE_FILE = "crawl_trace.jsonl"
+REPORT_PERCENTILES = (50, 90, 95, 99)
+
+# Detection methods, as tagged on spans
+M_PAYLOAD = "payload"      # #0 Amazon entry in the widget's retailer payload
+M_NEARBY = "nearby"        # #1 Nearby Retailer Amazon block
+M_ONLINE = "online"        # #2 Find Online tab, retailer name
+M_SELLER_ID = "seller_id"  # #3 Find Online tab, data-seller="2"
+
+
+class ProductTrace:
+    """Spans for one extract_amazon call, written out on finish()."""
+
+    def __init__(self, tracer, product_url, category=None):
+        self.tracer = tracer
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.product_url = product_url
+        self.category = category
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.spans = []
+        self.method = None
+        self.zip = None
+
+    @contextmanager
+    def span(self, step, **tags):
+        start = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.spans.append({
+                "step": step,
+                "offset_ms": round((start - self.started) * 1000, 1),
+                "ms": round((time.perf_counter() - start) * 1000, 1),
+                "ok": ok,
+                **tags,
+            })
+
+    def hit(self, method, zipcode=None):
+        """Record the method (and ZIP) that produced the Amazon link; first one wins."""
+        if self.method is None:
+            self.method = method
+            self.zip = zipcode
+
+    def finish(self, found):
+        total_ms = round((time.perf_counter() - self.started) * 1000, 1)
+        base = {
+            "trace": self.trace_id,
+            "ts": round(self.started_at, 3),
+            "url": self.product_url,
+            "category": self.category,
+            "method": self.method,
+            "hit_zip": self.zip,
+        }
+        lines = [{**base, **s} for s in self.spans]
+        lines.append({**base, "step": "product", "offset_ms": 0.0, "ms": total_ms, "ok": bool(found)})
+        if self.tracer:
+            self.tracer.write(lines)
+        return lines
+
+
+class _NullTrace:
+    """Stand-in when tracing is off, so call sites need no checks."""
+
+    method = None
+
+    @contextmanager
+    def span(self, step, **tags):
+        yield
+
+    def hit(self, method, zipcode=None):
+        pass
+
+    def finish(self, found):
+        return []
+
+
+NULL_TRACE = _NullTrace()
+
+
+class Tracer:
+    """Appends finished product traces to a JSONL file (one write per product)."""
+
+    def __init__(self, path=TRACE_FILE):
+        self.path = path
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._fh = open(path, "a", encoding="utf-8")
+
+    def product(self, product_url, category=None):
+        return ProductTrace(self, product_url, category)
+
+    def write(self, lines):
+        self._fh.write("".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines))
+        self._fh.flush()
+
+    def close(self):
+        self._fh.close()
+
+
+# ---------------------------------------------------------
+# REPORT
+# ---------------------------------------------------------
+def load_spans(path=TRACE_FILE):
+    spans = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                spans.append(json.loads(line))
+    return spans
+
+
+def aggregate(spans, by=None):
+    """{(group, step): {count, errors, pXX_ms, max_ms, total_ms}}"""
+    groups = defaultdict(list)
+    errors = defaultdict(int)
+    for s in spans:
+        key = (s.get(by) if by else None, s["step"])
+        groups[key].append(s["ms"])
+        if not s.get("ok", True):
+            errors[key] += 1
+
+    out = {}
+    for key, values in groups.items():
+        row = {"count": len(values), "errors": errors[key]}
+        for pct in REPORT_PERCENTILES:
+            row[f"p{pct}_ms"] = percentile(values, pct)
+        row["max_ms"] = max(values)
+        row["total_ms"] = round(sum(values), 1)
+        out[key] = row
+    return out
+
+
+def print_report(spans, by=None):
+    products = [s for s in spans if s["step"] == "product"]
+    print(f"\n🧭 {len(products)} products, {len(spans) - len(products)} step spans")
+    if products:
+        methods = defaultdict(int)
+        for s in products:
+            methods[s.get("method") or "none"] += 1
+        print("   methods:", json.dumps(dict(methods)))
+
+    header = f"   {'step':<14}" + (f" {by:<12}" if by else "")
+    header += f" {'n':>5} {'err':>4}" + "".join(f" {f'p{p}':>7}" for p in REPORT_PERCENTILES)
+    header += f" {'max':>7} {'total s':>8}"
+    print(header)
+
+    rows = aggregate(spans, by)
+    for (group, step), r in sorted(rows.items(), key=lambda kv: (kv[0][1], str(kv[0][0]))):
+        line = f"   {step:<14}" + (f" {str(group):<12}" if by else "")
+        line += f" {r['count']:>5} {r['errors']:>4}"
+        line += "".join(f" {r[f'p{p}_ms']:>7.0f}" for p in REPORT_PERCENTILES)
+        line += f" {r['max_ms']:>7.0f} {r['total_ms'] / 1000:>8.1f}"
+        print(line)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-step percentiles from a crawl trace")
+    parser.add_argument("path", nargs="?", default=TRACE_FILE)
+    parser.add_argument("--by", choices=("method", "category", "zip", "hit_zip"),
+                        help="split each step by this tag")
+    parser.add_argument("--json", action="store_true", help="print the aggregate as JSON")
+    args = parser.parse_args()
+
+    spans = load_spans(args.path)
+    if args.json:
+        rows = aggregate(spans, args.by)
+        print(json.dumps(
+            [{"step": step, args.by or "group": group, **r} for (group, step), r in rows.items()],
+            indent=2,
+        ))
+    else:
+        print_report(spans, args.by)
@@ -0,0 +1,370 @@
+###############################################
+# Local kindsnacks + WTB widget stand-in
+###############################################
+# Serves a fake product page with the same selectors extract_amazon reads
+# (h1.pdp-hero__product-name, .ps-widget, input.ps-map-location-textbox,
+# seller rows) and the retailer list the widget fetches as JSON, so the
+# scraper can be exercised without touching kindsnacks.com.
+#
+#   python standin_server.py          # serve on :8765 until Ctrl+C
+#   python standin_server.py --check  # run extract_amazon against it, exit 1 on a mismatch
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+# The widget backend and its redirector are served under real PriceSpider
+# hostnames so the scraper's WTB host filter matches them unchanged; the
+# browser maps them to this server (see StandinServer.browser_args).
+WIDGET_HOST = "widget.pricespider.com"
+REDIRECT_HOST = "redir.pricespider.com"
+RETAILER_PATH = "/retailers"
+
+PDP_HTML = """<!doctype html>
+<html><head><title>{title}</title></head>
+<body>
+<h1 class="pdp-hero__product-name">{title}</h1>
+<img class="pdp-hero-slide__image" src="/img/{slug}.png">
+<div class="ps-widget" style="cursor:pointer">Where to buy</div>
+<div id="lightbox"></div>
+<script>
+const SLUG = {slug_json};
+const INLINE = {inline_json};
+const lightbox = document.getElementById("lightbox");
+
+function renderSellers(retailers) {{
+  document.getElementById("sellers").innerHTML = retailers.map(r =>
+    `<li data-seller="${{r.sellerId}}">
+       <div class="ps-online-seller-details-wrapper" data-retailer="${{r.name}}">
+         <button class="ps-online-buy-button" data-href="${{r.buyUrl}}">Buy</button>
+       </div>
+     </li>`).join("");
+  document.querySelectorAll("button.ps-online-buy-button").forEach(b =>
+    b.addEventListener("click", () => window.open(b.dataset.href, "_blank")));
+}}
+
+async function loadRetailers(zip) {{
+  if (INLINE) {{
+    renderSellers(INLINE[zip] || INLINE[""] || []);
+    return;
+  }}
+  const r = await fetch("{retailer_url}?product=" + SLUG + "&zip=" + encodeURIComponent(zip));
+  renderSellers((await r.json()).retailers);
+}}
+
+document.querySelector(".ps-widget").addEventListener("click", () => {{
+  lightbox.innerHTML = `
+    <h2 class="ps-local-heading">Nearby</h2>
+    <input class="ps-map-location-textbox">
+    <span class="ps-map-location-button">Search</span>
+    <div data-item="onlineSellers">Find Online</div>
+    <ul id="sellers"></ul>`;
+  document.querySelector("span.ps-map-location-button").addEventListener("click", () =>
+    loadRetailers(document.querySelector("input.ps-map-location-textbox").value));
+  loadRetailers("");
+}});
+</script>
+</body></html>
+"""
+
+
+# ---------------------------------------------------------
+# CATALOG
+# ---------------------------------------------------------
+def make_product(slug, asin="B000STANDIN", amazon_zip="", inline=False):
+    """
+    amazon_zip: ZIP at which Amazon appears in the retailer list
+                ("" = immediately, None = never).
+    inline:     embed the retailer list in the page instead of fetching it,
+                i.e. no JSON payload for the network capture to see.
+    """
+    return {
+        "slug": slug,
+        "title": slug.replace("-", " ").title(),
+        "asin": asin,
+        "amazon_zip": amazon_zip,
+        "inline": inline,
+    }
+
+
+DEFAULT_CATALOG = [
+    make_product("caramel-almond-sea-salt", "B00STAND01"),
+    make_product("dark-chocolate-nuts", "B00STAND02", amazon_zip="10001"),
+    make_product("peanut-butter-inline", "B00STAND03", inline=True),
+    make_product("not-on-amazon", "B00STAND04", amazon_zip=None),
+]
+
+
+def retailers_for(product, zipcode, base_url, redirect_url=None):
+    rows = [{
+        "name": "Target",
+        "sellerId": 7,
+        "logo": f"{base_url}/img/target.png",
+        "url": "https://www.target.com/",
+        "buyUrl": f"{base_url}/retailer/target",
+    }]
+    amazon_zip = product["amazon_zip"]
+    if amazon_zip is not None and (amazon_zip == "" or amazon_zip == zipcode):
+        rows.insert(0, {
+            "name": "Amazon.com",
+            "sellerId": 2,
+            "logo": f"{base_url}/img/amazon.png",
+            "url": "https://www.amazon.com/",
+            "buyUrl": f"{redirect_url or base_url}/redirect/?asin={product['asin']}",
+        })
+    return rows
+
+
+# ---------------------------------------------------------
+# SERVER
+# ---------------------------------------------------------
+class StandinServer:
+    """
+    Threaded stand-in server. `delay_ms` is added to every retailer
+    response to mimic the widget backend. Browsers must be launched with
+    `browser_args` to reach the widget / redirect hostnames. `/redirect/?asin=`
+    answers with a 302 like redir.pricespider.com: to a local /dp/ page by default
+    (browser popups stay offline), or to amazon.com with
+    `redirect_to_amazon` (HTTP resolver, which stops before fetching it).
+
+        with StandinServer() as srv:
+            srv.product_url("caramel-almond-sea-salt")
+    """
+
+    def __init__(self, catalog=None, host=HOST, port=PORT, delay_ms=0, redirect_to_amazon=False):
+        self.catalog = {p["slug"]: p for p in (catalog or DEFAULT_CATALOG)}
+        self.host = host
+        self.port = port
+        self.delay_ms = delay_ms
+        self.redirect_to_amazon = redirect_to_amazon
+        self.hits = {"pdp": 0, "retailers": 0, "redirect": 0}
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def widget_url(self):
+        return f"http://{WIDGET_HOST}:{self.port}"
+
+    @property
+    def redirect_url(self):
+        return f"http://{REDIRECT_HOST}:{self.port}"
+
+    @property
+    def browser_args(self):
+        """Chromium flags that send the PriceSpider hostnames to this server."""
+        return [f"--host-resolver-rules=MAP {WIDGET_HOST} {self.host}, MAP {REDIRECT_HOST} {self.host}"]
+
+    def product_url(self, slug):
+        return f"{self.base_url}/products/standin/{slug}"
+
+    def product_urls(self):
+        return [self.product_url(slug) for slug in self.catalog]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real CDN
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, ctype, headers=None):
+                data = body.encode("utf-8") if isinstance(body, str) else body
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(data)
+
+            def do_HEAD(self):
+                self.do_GET()
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                qs = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+                if url.path.startswith("/products/"):
+                    product = server.catalog.get(url.path.rstrip("/").split("/")[-1])
+                    if not product:
+                        return self._send(404, "not found", "text/plain")
+                    server.hits["pdp"] += 1
+                    inline = None
+                    if product["inline"]:
+                        inline = {
+                            z: retailers_for(product, z, server.base_url, server.redirect_url)
+                            for z in ("", product["amazon_zip"] or "")
+                        }
+                    html = PDP_HTML.format(
+                        title=product["title"],
+                        slug=product["slug"],
+                        slug_json=json.dumps(product["slug"]),
+                        inline_json=json.dumps(inline),
+                        retailer_url=server.widget_url + RETAILER_PATH,
+                    )
+                    return self._send(200, html, "text/html; charset=utf-8")
+
+                if url.path == RETAILER_PATH:
+                    product = server.catalog.get(qs.get("product"))
+                    if not product:
+                        return self._send(404, "{}", "application/json")
+                    server.hits["retailers"] += 1
+                    if server.delay_ms:
+                        time.sleep(server.delay_ms / 1000)
+                    rows = retailers_for(product, qs.get("zip", ""), server.base_url, server.redirect_url)
+                    body = {"retailers": rows}
+                    # the page is served from base_url, so this is a cross-origin fetch
+                    return self._send(200, json.dumps(body), "application/json",
+                                      {"Access-Control-Allow-Origin": "*"})
+
+                if url.path.startswith("/redirect"):
+                    server.hits["redirect"] += 1
+                    target = "https://www.amazon.com" if server.redirect_to_amazon else server.base_url
+                    location = f"{target}/dp/{qs.get('asin')}?tag=standin-20"
+                    return self._send(302, "", "text/plain", {"Location": location})
+
+                if url.path.startswith("/dp/") or url.path.startswith("/retailer/"):
+                    return self._send(200, f"<html><body>{url.path}</body></html>", "text/html")
+
+                if url.path == "/sitemap.xml":
+                    locs = "".join(f"<url><loc>{u}</loc></url>" for u in server.product_urls())
+                    xml = f'<?xml version="1.0"?><urlset>{locs}</urlset>'
+                    return self._send(200, xml, "application/xml")
+
+                if url.path.startswith("/img/"):
+                    return self._send(200, b"", "image/png")
+
+                return self._send(404, "not found", "text/plain")
+
+        return Handler
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# ---------------------------------------------------------
+# CHECK: run the scraper against the stand-in
+# ---------------------------------------------------------
+# What DEFAULT_CATALOG must give, per slug: the ASIN in the Amazon link
+# (None = no link), the ZIP that must hit, and whether the capture run
+# has to come from the widget payload or fall back to the click path.
+EXPECTED = {
+    "caramel-almond-sea-salt": {"asin": "B00STAND01", "capture": "payload"},
+    "dark-chocolate-nuts": {"asin": "B00STAND02", "zip": "10001"},
+    "peanut-butter-inline": {"asin": "B00STAND03", "capture": "click"},
+    "not-on-amazon": {"asin": None},
+}
+
+
+class _LastTrace:
+    """Tracer stand-in that keeps the last product's trace in memory."""
+
+    last = None
+
+    def product(self, product_url, category=None):
+        from span_trace import ProductTrace
+
+        self.last = ProductTrace(None, product_url, category)
+        return self.last
+
+
+def check_result(slug, capture, amazon, trace):
+    """Mismatches (list of strings) between one extract_amazon run and EXPECTED."""
+    from span_trace import M_PAYLOAD
+
+    want = EXPECTED[slug]
+    errors = []
+    if want["asin"] is None:
+        if amazon:
+            errors.append(f"expected no Amazon link, got {amazon}")
+        return errors
+    if not amazon or want["asin"] not in amazon:
+        errors.append(f"expected a link to {want['asin']}, got {amazon}")
+    if want.get("zip") and trace.zip != want["zip"]:
+        errors.append(f"expected the hit at ZIP {want['zip']}, got {trace.zip}")
+    if capture and want.get("capture") == "payload" and trace.method != M_PAYLOAD:
+        errors.append(f"expected a widget payload hit, got {trace.method}")
+    if capture and want.get("capture") == "click" and trace.method in (None, M_PAYLOAD):
+        errors.append(f"expected the click-path fallback, got {trace.method}")
+    return errors
+
+
+async def run_check():
+    """Run extract_amazon over DEFAULT_CATALOG in both modes; True if all match EXPECTED."""
+    from playwright.async_api import async_playwright
+
+    from cat import extract_amazon
+
+    failures = 0
+    tracer = _LastTrace()
+    with StandinServer(port=0) as srv:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True, args=srv.browser_args)
+            page = await browser.new_page()
+            for capture in (True, False):
+                for url in srv.product_urls():
+                    slug = url.rsplit("/", 1)[-1]
+                    res = await extract_amazon(page, url, network_capture=capture, tracer=tracer)
+                    errors = check_result(slug, capture, res["amazon"], tracer.last)
+                    failures += bool(errors)
+                    label = f"{'capture' if capture else 'click'} {slug}"
+                    detail = f"{tracer.last.method or '-'} @ {tracer.last.zip or '-'}"
+                    print(f"{'✅' if not errors else '❌'} {label:<32} {detail:<20} {res['amazon']}")
+                    for e in errors:
+                        print("     ", e)
+            await browser.close()
+
+    print("hits:", srv.hits)
+    print("✔ stand-in check passed" if not failures else f"❌ {failures} stand-in check(s) failed")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="kindsnacks / WTB stand-in server")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--delay-ms", type=int, default=0)
+    parser.add_argument("--check", action="store_true", help="run extract_amazon against the stand-in and check the results")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if asyncio.run(run_check()) else 1)
+    else:
+        srv = StandinServer(port=args.port, delay_ms=args.delay_ms).start()
+        print(f"🧪 Stand-in serving {len(srv.catalog)} products on {srv.base_url}")
+        for url in srv.product_urls():
+            print("  ", url)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            srv.stop()
@@ -0,0 +1,197 @@
+###############################################
+# Streaming ASIN merge with bounded memory
+###############################################
+# Same rule as amazon_norm / dupicate (first item per ASIN wins, in
+# category order, tagged with its category) but items are decoded one at
+# a time from each results.json and written straight out as NDJSON. Only
+# the set of ASINs already written stays in memory.
+#
+#   python dupicate.py --stream                  # all_products_merged.ndjson
+#   python stream_merge.py --bench 200000        # time / peak RSS: full, parallel, stream
+#   python stream_merge.py --bench 200000 --bench-workers 8
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+STREAM_OUTPUT = "all_products_merged.ndjson"
+CHUNK_SIZE = 1 << 16
+BENCH_CATEGORIES = 12
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def iter_json_array(path, chunk_size=CHUNK_SIZE):
+    """
+    Yield the objects of a top-level JSON array one by one, reading
+    `chunk_size` characters at a time. Only the current chunk and the item
+    being decoded are held in memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = f.read(chunk_size).lstrip()
+        if not buf.startswith("["):
+            raise ValueError(f"{path}: expected a JSON array")
+        buf = buf[1:]
+        while True:
+            buf = buf.lstrip(" \t\r\n,")
+            if not buf:
+                buf = f.read(chunk_size)
+                if not buf:
+                    raise ValueError(f"{path}: unterminated JSON array")
+                continue
+            if buf[0] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf)
+            except json.JSONDecodeError:
+                # item runs past the buffer (objects can't decode early)
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise
+                buf += chunk
+                continue
+            yield item
+            buf = buf[end:]
+
+
+def iter_ndjson(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_merged(base_dir, category_order, seen=None):
+    """First item per ASIN across <base_dir>/<category>/results.json, in order."""
+    seen = set() if seen is None else seen
+    for category in category_order:
+        path = os.path.join(base_dir, category, "results.json")
+        if not os.path.exists(path):
+            continue
+        for item in iter_json_array(path):
+            asin = item.get("asin")
+            if not asin or asin in seen:
+                continue
+            seen.add(asin)
+            item["category"] = category
+            yield item
+
+
+def stream_merge(base_dir, category_order, output_file=STREAM_OUTPUT):
+    """Write the merge as NDJSON; returns stats incl. peak RSS."""
+    start = time.perf_counter()
+    seen = set()
+    written = 0
+    tmp = output_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as out:
+        for item in iter_merged(base_dir, category_order, seen):
+            out.write(json.dumps(item, ensure_ascii=False))
+            out.write("\n")
+            written += 1
+    os.replace(tmp, output_file)
+
+    stats = {
+        "items": written,
+        "seconds": round(time.perf_counter() - start, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "output": output_file,
+    }
+    print(f"🌊 Streamed {written} unique ASINs → {output_file} "
+          f"in {stats['seconds']}s, peak RSS {stats['peak_rss_mb']} MB")
+    return stats
+
+
+# ---------------------------------------------------------
+# BENCH: peak RSS of the full vs streaming merge on synthetic input
+# ---------------------------------------------------------
+def _synthetic_input(root, n_items, template_dir="all_products_3"):
+    """n_items ASINs spread over BENCH_CATEGORIES files + an All_Snacks copy of ~1/3."""
+    templates = list(iter_json_array(os.path.join(template_dir, "Nut_Bars", "results.json")))
+    rng = random.Random(0)
+    categories = [f"Cat_{i:02d}" for i in range(BENCH_CATEGORIES)]
+    files = {}
+    for c in categories + ["All_Snacks"]:
+        os.makedirs(os.path.join(root, c), exist_ok=True)
+        files[c] = open(os.path.join(root, c, "results.json"), "w", encoding="utf-8")
+        files[c].write("[")
+    first = {c: True for c in files}
+
+    def emit(c, item):
+        files[c].write(("\n" if first[c] else ",\n") + json.dumps(item, indent=2, ensure_ascii=False))
+        first[c] = False
+
+    for i in range(n_items):
+        item = dict(templates[i % len(templates)], asin=f"B{i:09d}")
+        emit(categories[i % len(categories)], item)
+        if rng.random() < 0.33:
+            emit("All_Snacks", item)
+    for f in files.values():
+        f.write("\n]")
+        f.close()
+    return categories + ["All_Snacks"]
+
+
+def _run_child(mode, base_dir, order, output):
+    mode, _, workers = mode.partition(":")
+    if mode == "stream":
+        stats = stream_merge(base_dir, order, output)
+    else:
+        from merge_index import PARSE_WORKERS, incremental_merge
+
+        workers = (int(workers) if workers else PARSE_WORKERS) if mode == "parallel" else 1
+        stats = incremental_merge(base_dir, order, output, full=True, workers=workers)
+        stats["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    print("RESULT " + json.dumps(stats))
+
+
+def bench(n_items, workers=None):
+    with tempfile.TemporaryDirectory(prefix="kind_merge_bench_") as root:
+        base = os.path.join(root, "in")
+        order = _synthetic_input(base, n_items)
+        size_mb = sum(
+            os.path.getsize(os.path.join(base, c, "results.json")) for c in order
+        ) / 1e6
+        print(f"🧪 {n_items} ASINs, {size_mb:.0f} MB of results.json, {os.cpu_count()} cores")
+        for mode in ("full", "parallel", "stream"):
+            child = f"{mode}:{workers}" if mode == "parallel" and workers else mode
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", child, base, ",".join(order),
+                 os.path.join(root, f"out_{mode}")],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            stats = json.loads(out.split("RESULT ", 1)[1])
+            print(f"   {child:<10} {stats['seconds']:>7.1f}s  peak RSS {stats['peak_rss_mb']:>8.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming ASIN merge (NDJSON, bounded memory)")
+    parser.add_argument("--base-dir", default="all_products_3")
+    parser.add_argument("--output", default=STREAM_OUTPUT)
+    parser.add_argument("--bench", type=int, metavar="N", help="compare peak RSS on N synthetic ASINs")
+    parser.add_argument("--bench-workers", type=int, help="parser processes for the parallel run (default: cores)")
+    parser.add_argument("--child", nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, base_dir, order, output = args.child
+        _run_child(mode, base_dir, order.split(","), output)
+    elif args.bench:
+        bench(args.bench, args.bench_workers)
+    else:
+        from merge_index import merge_order
+
+        stream_merge(args.base_dir, merge_order(args.base_dir), args.output)
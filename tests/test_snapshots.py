@@ -0,0 +1,72 @@
+import asyncio
+import os
+
+import pytest
+
+from snapshots import SnapshotStore, popup_link
+
+STORE = os.path.join(os.path.dirname(__file__), "fixtures", "snapshot_store")
+BASE = "http://127.0.0.1:8765/products/standin"
+
+
+def _manifest(store, slug):
+    return store.index[f"{BASE}/{slug}"]
+
+
+def test_payload_link_comes_from_the_recorded_widget_response():
+    store = SnapshotStore(STORE)
+    assert store.payload_link(_manifest(store, "caramel-almond-sea-salt")) == \
+        "http://redir.pricespider.com:8765/redirect/?asin=B00STAND01"
+    assert store.payload_link(_manifest(store, "not-on-amazon")) is None
+    # inline retailer list: nothing on the wire
+    assert store.payload_link(_manifest(store, "peanut-butter-inline")) is None
+
+
+def test_popup_link_skips_about_blank():
+    store = SnapshotStore(STORE)
+    assert popup_link(_manifest(store, "peanut-butter-inline")) == "http://127.0.0.1:8765/dp/B00STAND03?tag=standin-20"
+    assert popup_link({"popups": ["about:blank"]}) is None
+    assert popup_link({}) is None
+
+
+def _replay(manifests):
+    """extract_from_snapshot over `manifests` in an offline, JS-less page."""
+    from playwright.async_api import async_playwright
+
+    from cat import extract_from_snapshot
+
+    store = SnapshotStore(STORE)
+
+    async def run():
+        async with async_playwright() as p:
+            try:
+                browser = await p.chromium.launch(headless=True)
+            except Exception as e:
+                pytest.skip(f"no Chromium: {e}")
+            context = await browser.new_context(java_script_enabled=False, offline=True)
+            await context.route("**/*", lambda route: route.abort())
+            page = await context.new_page()
+            out = [await extract_from_snapshot(page, store, m) for m in manifests]
+            await browser.close()
+            return out
+
+    return asyncio.run(run())
+
+
+def test_replay_extracts_the_recorded_snapshots():
+    store = SnapshotStore(STORE)
+    results = _replay([_manifest(store, s) for s in ("caramel-almond-sea-salt", "peanut-butter-inline", "not-on-amazon")])
+    assert [r["title"] for r in results] == ["Caramel Almond Sea Salt", "Peanut Butter Inline", "Not On Amazon"]
+    assert [r["amazon"] for r in results] == [
+        "http://redir.pricespider.com:8765/redirect/?asin=B00STAND01",
+        "http://127.0.0.1:8765/dp/B00STAND03?tag=standin-20",
+        None,
+    ]
+
+
+def test_replay_does_not_echo_the_live_result():
+    store = SnapshotStore(STORE)
+    manifest = dict(_manifest(store, "peanut-butter-inline"), popups=[], result={"amazon": "https://wrong.example/"})
+    (result,) = _replay([manifest])
+    # falls back to the buy button's data-href in the stored DOM
+    assert result["amazon"] == "http://redir.pricespider.com:8765/redirect/?asin=B00STAND03"
@@ -0,0 +1,81 @@
+import asyncio
+import json
+import urllib.request
+from types import SimpleNamespace
+
+from standin_server import RETAILER_PATH, StandinServer
+from waits import is_wtb_response
+from wtb_capture import WtbCapture, find_amazon_link
+
+
+def _retailers(srv, slug, zipcode=""):
+    url = f"{srv.base_url}{RETAILER_PATH}?product={slug}&zip={zipcode}"
+    with urllib.request.urlopen(url) as resp:
+        return json.load(resp)
+
+
+def test_standin_payload_gives_the_amazon_redirect():
+    with StandinServer(port=0) as srv:
+        assert find_amazon_link(_retailers(srv, "caramel-almond-sea-salt")) == \
+            f"{srv.redirect_url}/redirect/?asin=B00STAND01"
+        assert find_amazon_link(_retailers(srv, "dark-chocolate-nuts")) is None
+        assert find_amazon_link(_retailers(srv, "dark-chocolate-nuts", "10001")).endswith("asin=B00STAND02")
+        assert find_amazon_link(_retailers(srv, "not-on-amazon")) is None
+
+
+def test_seller_id_and_generic_links_do_not_count():
+    payload = {"retailers": [
+        # seller id 2 is only the DOM position Method #3 clicks, not Amazon's id
+        {"name": "Walmart", "sellerId": 2, "buyUrl": "https://redir.pricespider.com/?url=https%3A%2F%2Fwww.walmart.com%2F"},
+        # logo / store page only, no buy link
+        {"name": "Amazon.com", "logo": "https://images.pricespider.com/amazon.png", "url": "https://www.amazon.com/"},
+    ]}
+    assert find_amazon_link(payload) is None
+
+
+def test_buy_link_must_lead_to_amazon():
+    amazon = "https://redir.pricespider.com/r?url=https%3A%2F%2Fwww.amazon.com%2Fdp%2FB000TEST01"
+    payload = {"data": {"sellers": [
+        {"retailerName": "Amazon", "clickUrl": "https://www.target.com/p/kind"},
+        {"retailerDomain": "www.amazon.com", "redirectUrl": amazon},
+    ]}}
+    assert find_amazon_link(payload) == amazon
+
+
+def test_wtb_response_matches_the_hostname():
+    def resp(url):
+        return SimpleNamespace(url=url)
+
+    assert is_wtb_response(resp("https://widget.pricespider.com/retailers?zip=10001"))
+    assert is_wtb_response(resp("https://pricespider.com/x"))
+    assert not is_wtb_response(resp("http://127.0.0.1:8765/pricespider.com/retailers"))
+    assert not is_wtb_response(resp("https://notpricespider.com/retailers"))
+    assert not is_wtb_response(resp("https://www.kindsnacks.com/?ref=pricespider.com"))
+
+
+def test_capture_keeps_the_link_from_a_widget_response():
+    class Page:
+        def on(self, event, handler):
+            self.handler = handler
+
+        def remove_listener(self, event, handler):
+            pass
+
+    def response(url, payload, ctype="application/json"):
+        async def text():
+            return json.dumps(payload)
+
+        return SimpleNamespace(url=url, headers={"content-type": ctype}, text=text)
+
+    amazon = {"retailers": [{"name": "Amazon.com", "buyUrl": "https://www.amazon.com/dp/B000TEST01"}]}
+
+    async def run():
+        page = Page()
+        capture = WtbCapture(page)
+        await page.handler(response("https://www.kindsnacks.com/api/x", amazon))
+        await page.handler(response("https://widget.pricespider.com/retailers", amazon, "text/html"))
+        assert capture.amazon_link is None
+        await page.handler(response("https://widget.pricespider.com/retailers", amazon))
+        return await capture.wait(100)
+
+    assert asyncio.run(run()) == "https://www.amazon.com/dp/B000TEST01"
@@ -0,0 +1,270 @@
+import asyncio
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+# Per-step upper bounds (ms). A step returns as soon as its condition is
+# seen, these only cap the worst case.
+STEP_TIMEOUTS = {
+    "page_ready": 10000,
+    "widget_open": 8000,
+    "nearby_tab": 3000,
+    "seller_list": 8000,
+    "online_tab": 4000,
+    "popup": 10000,
+}
+
+# After the widget backend answers, give the DOM this long to re-render.
+SETTLE_MS = 750
+
+# Responses from these hosts (or their subdomains) mean the WTB widget got
+# fresh retailer data.
+WTB_RESPONSE_HOSTS = ("pricespider.com",)
+
+HISTOGRAM_BUCKETS_MS = (50, 100, 250, 500, 1000, 2000, 4000, 8000)
+
+SELLER_SELECTOR = (
+    "div.ps-online-seller-details-wrapper, "
+    "li[data-seller], "
+    ".ps-local-seller"
+)
+
+_SELLER_SIGNATURE_JS = """
+(selector) => Array.from(document.querySelectorAll(selector))
+    .map(e => e.getAttribute('data-retailer')
+           || e.getAttribute('data-seller')
+           || (e.textContent || '').trim().slice(0, 40))
+    .join('|')
+"""
+
+
+# ---------------------------------------------------------
+# LATENCY HISTOGRAM
+# ---------------------------------------------------------
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    idx = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[idx]
+
+
+class StepLatency:
+    """Collects wait latencies (ms) per step plus timeout counts."""
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS_MS):
+        self.buckets = buckets
+        self.samples = defaultdict(list)
+        self.timeouts = defaultdict(int)
+
+    def record(self, step, ms, timed_out=False):
+        self.samples[step].append(ms)
+        if timed_out:
+            self.timeouts[step] += 1
+
+    def histogram(self, step):
+        hist = {f"<={b}ms": 0 for b in self.buckets}
+        hist[f">{self.buckets[-1]}ms"] = 0
+        for ms in self.samples[step]:
+            for b in self.buckets:
+                if ms <= b:
+                    hist[f"<={b}ms"] += 1
+                    break
+            else:
+                hist[f">{self.buckets[-1]}ms"] += 1
+        return hist
+
+    def summary(self):
+        out = {}
+        for step, values in self.samples.items():
+            out[step] = {
+                "count": len(values),
+                "timeouts": self.timeouts[step],
+                "p50_ms": percentile(values, 50),
+                "p95_ms": percentile(values, 95),
+                "max_ms": max(values),
+                "total_ms": round(sum(values), 1),
+                "histogram": self.histogram(step),
+            }
+        return out
+
+    def print_summary(self):
+        print("\n⏱  Wait latency per step")
+        for step, s in self.summary().items():
+            print(
+                f"   {step:<12} n={s['count']:<4} p50={s['p50_ms']:.0f}ms "
+                f"p95={s['p95_ms']:.0f}ms max={s['max_ms']:.0f}ms "
+                f"timeouts={s['timeouts']}"
+            )
+
+
+LATENCY = StepLatency()
+
+
+# ---------------------------------------------------------
+# WAIT PRIMITIVES
+# ---------------------------------------------------------
+async def timed_wait(step, coro, stats=None):
+    """
+    Await `coro` (which carries its own Playwright timeout) and record how
+    long it took under `step`. Returns True if the condition was met,
+    False on timeout — callers carry on either way, like the old sleeps.
+    """
+    stats = stats or LATENCY
+    start = time.perf_counter()
+    ok = True
+    try:
+        await coro
+    except (PlaywrightTimeoutError, asyncio.TimeoutError):
+        ok = False
+    stats.record(step, (time.perf_counter() - start) * 1000, timed_out=not ok)
+    return ok
+
+
+def _step_timeout(step):
+    return STEP_TIMEOUTS.get(step, 5000)
+
+
+def is_wtb_response(response):
+    """Response (or request) from a WTB backend host, matched on the hostname."""
+    host = (urlparse(response.url).hostname or "").lower()
+    return any(host == h or host.endswith("." + h) for h in WTB_RESPONSE_HOSTS)
+
+
+async def wait_page_ready(page, stats=None):
+    """Product hero rendered (replaces load + sleep(2))."""
+    return await timed_wait(
+        "page_ready",
+        page.wait_for_selector("h1.pdp-hero__product-name", timeout=_step_timeout("page_ready")),
+        stats,
+    )
+
+
+async def wait_widget_open(page, stats=None):
+    """WTB lightbox rendered its location box or a seller row."""
+    return await timed_wait(
+        "widget_open",
+        page.wait_for_selector(
+            f"input.ps-map-location-textbox, {SELLER_SELECTOR}",
+            state="attached",
+            timeout=_step_timeout("widget_open"),
+        ),
+        stats,
+    )
+
+
+async def wait_nearby_tab(page, stats=None):
+    return await timed_wait(
+        "nearby_tab",
+        page.wait_for_selector(
+            "input.ps-map-location-textbox",
+            state="visible",
+            timeout=_step_timeout("nearby_tab"),
+        ),
+        stats,
+    )
+
+
+async def wait_online_tab(page, stats=None):
+    return await timed_wait(
+        "online_tab",
+        page.wait_for_selector(
+            "div.ps-online-seller-details-wrapper, li[data-seller]",
+            state="attached",
+            timeout=_step_timeout("online_tab"),
+        ),
+        stats,
+    )
+
+
+async def seller_signature(page):
+    try:
+        return await page.evaluate(_SELLER_SIGNATURE_JS, SELLER_SELECTOR)
+    except Exception:
+        return ""
+
+
+async def _seller_list_changed(page, previous, timeout):
+    await page.wait_for_function(
+        f"([sel, prev]) => ({_SELLER_SIGNATURE_JS})(sel) !== prev",
+        arg=[SELLER_SELECTOR, previous],
+        timeout=timeout,
+    )
+
+
+class _SellerListChanged(Exception):
+    """Leaves expect_response() early without waiting for the response."""
+
+
+async def _seller_list_updated(page, previous, click, timeout):
+    """
+    Run `click` with the widget-backend listener already armed, then
+    resolve on whichever comes first: the seller DOM changing, or the
+    backend answering (then allow SETTLE_MS for the re-render, since the
+    same retailers for a new ZIP leave the DOM untouched). If the DOM
+    wait breaks (the widget re-mounting its frame, ...) the backend
+    answer still counts.
+    """
+    dom = net = None
+    try:
+        async with page.expect_response(is_wtb_response, timeout=timeout) as response_info:
+            await click()
+            dom = asyncio.ensure_future(_seller_list_changed(page, previous, timeout))
+            net = asyncio.ensure_future(response_info.value)
+            finished, _ = await asyncio.wait({dom, net}, return_when=asyncio.FIRST_COMPLETED)
+            if dom in finished:
+                error = dom.exception()
+                if error is None:
+                    raise _SellerListChanged()
+                if not isinstance(error, PlaywrightError):
+                    raise error
+                await net
+                return
+            net.result()
+            try:
+                await asyncio.wait_for(asyncio.shield(dom), SETTLE_MS / 1000)
+            except (asyncio.TimeoutError, PlaywrightError):
+                pass
+    except _SellerListChanged:
+        pass
+    finally:
+        tasks = [t for t in (dom, net) if t is not None]
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def wait_seller_list(page, previous, click, stats=None):
+    """
+    Click the ZIP search (`click`: no-arg coroutine function) and wait for
+    the seller list to re-render (replaces sleep(3)).
+    """
+    return await timed_wait(
+        "seller_list",
+        _seller_list_updated(page, previous, click, _step_timeout("seller_list")),
+        stats,
+    )
+
+
+async def capture_popup_url(page, button, stats=None):
+    """Click a buy button and return the popup's URL once it navigates."""
+    start = time.perf_counter()
+    stats = stats or LATENCY
+    async with page.expect_popup(timeout=_step_timeout("popup")) as popup_info:
+        await button.click(force=True)
+    popup = await popup_info.value
+    try:
+        await popup.wait_for_url(lambda u: u != "about:blank", timeout=_step_timeout("popup"))
+    except PlaywrightTimeoutError:
+        pass
+    url = popup.url
+    await popup.close()
+    stats.record("popup", (time.perf_counter() - start) * 1000)
+    return url
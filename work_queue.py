@@ -0,0 +1,242 @@
+###############################################
+# SQLite crawl work queue (multi-process / multi-host)
+###############################################
+# Several `python cat.py --worker` processes (or hosts sharing a volume) can
+# drain the same product list: each claims a batch under a lease, extends
+# it while working, and completes or fails it. Leases left by crashed
+# workers expire and the URLs become claimable again.
+#
+# Hosts sharing a volume: the database stays in the default rollback
+# journal (journal_mode=DELETE), which only needs working file locks on
+# the share. WAL keeps its index in shared memory (the -shm file), which
+# does not work across machines on NFS/SMB and can corrupt the queue, so
+# it is opt-in for queues used by one host only. The mode is stored in the
+# database file, so it is set once from the CLI and workers keep it:
+#
+#   python work_queue.py --journal-mode wal     # single host
+#   python work_queue.py --journal-mode delete  # back to shared-volume safe
+#
+#   python work_queue.py --seed                 # load links.json files
+#   python work_queue.py --priority Nut_Bars=10 # bump a category
+#   python work_queue.py --status
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+QUEUE_DB = "crawl_queue.sqlite"
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 4
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    url         TEXT PRIMARY KEY,
+    category    TEXT NOT NULL,
+    priority    INTEGER NOT NULL DEFAULT 0,
+    state       TEXT NOT NULL DEFAULT 'queued',
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_until REAL,
+    result      TEXT,
+    error       TEXT,
+    updated_at  REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (state, priority DESC, lease_until);
+CREATE TABLE IF NOT EXISTS priorities (
+    category TEXT PRIMARY KEY,
+    priority INTEGER NOT NULL
+);
+"""
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class WorkQueue:
+    """
+    Job table in one SQLite file. Claims run inside BEGIN IMMEDIATE so only
+    one process can hand out a given URL. journal_mode (None = keep the
+    file's, DELETE for a new one) "WAL" keeps readers unblocked but is only
+    safe when all workers share one host.
+    """
+
+    def __init__(self, path=QUEUE_DB, owner=None, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS,
+                 journal_mode=None):
+        self.path = path
+        self.owner = owner or worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        if journal_mode:
+            self.db.execute(f"PRAGMA journal_mode={journal_mode}")
+        self.db.execute("PRAGMA busy_timeout=30000")
+        self.db.executescript(SCHEMA)
+
+    # --- producer side ---
+    def seed(self, links, reset=False):
+        """Insert {category: [url]}; existing URLs keep their state unless reset."""
+        now = time.time()
+        added = 0
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            for category, urls in links.items():
+                prio = self.category_priority(category)
+                for url in urls:
+                    if reset:
+                        cur = self.db.execute(
+                            "INSERT OR REPLACE INTO jobs (url, category, priority, updated_at) VALUES (?, ?, ?, ?)",
+                            (url, category, prio, now),
+                        )
+                    else:
+                        cur = self.db.execute(
+                            "INSERT OR IGNORE INTO jobs (url, category, priority, updated_at) VALUES (?, ?, ?, ?)",
+                            (url, category, prio, now),
+                        )
+                    added += cur.rowcount
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        return added
+
+    def category_priority(self, category):
+        row = self.db.execute("SELECT priority FROM priorities WHERE category = ?", (category,)).fetchone()
+        return row["priority"] if row else 0
+
+    def set_priority(self, category, priority):
+        self.db.execute(
+            "INSERT INTO priorities (category, priority) VALUES (?, ?) "
+            "ON CONFLICT(category) DO UPDATE SET priority = excluded.priority",
+            (category, priority),
+        )
+        self.db.execute("UPDATE jobs SET priority = ? WHERE category = ?", (priority, category))
+
+    # --- worker side ---
+    def claim(self, n=1):
+        """
+        Lease up to n jobs: queued ones, plus leased ones whose lease ran out
+        (crashed worker). Highest category priority first. Expired leases
+        that already used their last attempt are marked FAILED instead.
+        Returns [(category, url)].
+        """
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            self.db.execute(
+                "UPDATE jobs SET state = ?, error = COALESCE(error, ?), lease_owner = NULL, "
+                "lease_until = NULL, updated_at = ? WHERE state = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, "lease expired on last attempt", now, LEASED, now, self.max_attempts),
+            )
+            rows = self.db.execute(
+                """
+                SELECT url, category FROM jobs
+                WHERE (state = ? OR (state = ? AND lease_until < ?))
+                  AND attempts < ?
+                ORDER BY priority DESC, attempts ASC, rowid ASC
+                LIMIT ?
+                """,
+                (QUEUED, LEASED, now, self.max_attempts, n),
+            ).fetchall()
+            for row in rows:
+                self.db.execute(
+                    "UPDATE jobs SET state = ?, lease_owner = ?, lease_until = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE url = ?",
+                    (LEASED, self.owner, now + self.lease_seconds, now, row["url"]),
+                )
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        return [(row["category"], row["url"]) for row in rows]
+
+    def extend(self, url):
+        """Push our lease forward; False if another worker took the job."""
+        cur = self.db.execute(
+            "UPDATE jobs SET lease_until = ? WHERE url = ? AND state = ? AND lease_owner = ?",
+            (time.time() + self.lease_seconds, url, LEASED, self.owner),
+        )
+        return cur.rowcount == 1
+
+    def complete(self, url, result):
+        cur = self.db.execute(
+            "UPDATE jobs SET state = ?, result = ?, error = NULL, lease_owner = NULL, "
+            "lease_until = NULL, updated_at = ? WHERE url = ? AND lease_owner = ?",
+            (DONE, json.dumps(result, ensure_ascii=False), time.time(), url, self.owner),
+        )
+        return cur.rowcount == 1
+
+    def fail(self, url, error=None, result=None):
+        """Back to the queue, or FAILED once max_attempts is used up."""
+        self.db.execute(
+            "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+            "error = ?, result = COALESCE(?, result), lease_owner = NULL, lease_until = NULL, "
+            "updated_at = ? WHERE url = ? AND lease_owner = ?",
+            (
+                self.max_attempts, FAILED, QUEUED,
+                str(error) if error else None,
+                json.dumps(result, ensure_ascii=False) if result is not None else None,
+                time.time(), url, self.owner,
+            ),
+        )
+
+    # --- reporting ---
+    def counts(self):
+        rows = self.db.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state").fetchall()
+        return {row["state"]: row["n"] for row in rows}
+
+    def remaining(self):
+        """Claimable jobs plus every leased one (its lease may still expire)."""
+        row = self.db.execute(
+            "SELECT COUNT(*) AS n FROM jobs WHERE (state = ? AND attempts < ?) OR state = ?",
+            (QUEUED, self.max_attempts, LEASED),
+        ).fetchone()
+        return row["n"]
+
+    def results(self):
+        """{category: {url: result}} for every job that has a result."""
+        out = {}
+        for row in self.db.execute("SELECT category, url, result FROM jobs WHERE result IS NOT NULL"):
+            out.setdefault(row["category"], {})[row["url"]] = json.loads(row["result"])
+        return out
+
+    def close(self):
+        self.db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite crawl work queue")
+    parser.add_argument("--db", default=QUEUE_DB)
+    parser.add_argument("--seed", nargs="?", const="kind_products_final", help="links dir to load")
+    parser.add_argument("--reset", action="store_true", help="re-queue URLs that already exist")
+    parser.add_argument("--priority", action="append", default=[], metavar="CATEGORY=N")
+    parser.add_argument("--status", action="store_true")
+    parser.add_argument("--journal-mode", choices=("delete", "wal"),
+                        help="switch the queue's SQLite journal (wal: single host only)")
+    args = parser.parse_args()
+
+    q = WorkQueue(args.db, journal_mode=args.journal_mode)
+    for spec in args.priority:
+        category, _, prio = spec.partition("=")
+        q.set_priority(category, int(prio))
+        print(f"⬆ {category} priority {prio}")
+    if args.seed:
+        from cat import load_links
+
+        added = q.seed(load_links(args.seed), reset=args.reset)
+        print(f"🌱 Seeded {added} URLs from {args.seed}")
+    mode = q.db.execute("PRAGMA journal_mode").fetchone()[0]
+    print("📋 Queue:", json.dumps(q.counts()), f"(journal_mode={mode})")
+    q.close()
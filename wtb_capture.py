@@ -0,0 +1,132 @@
+import asyncio
+import json
+from urllib.parse import parse_qs, urlparse
+
+from waits import WTB_RESPONSE_HOSTS, is_wtb_response
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+# How long to wait for the widget's retailer payload after it opens / after
+# a ZIP search before falling back to the click path.
+PAYLOAD_TIMEOUT_MS = 4000
+ZIP_PAYLOAD_TIMEOUT_MS = 500
+
+AMAZON_NAMES = ("amazon.com", "amazon")
+AMAZON_DOMAINS = ("amazon.com",)
+
+NAME_KEYS = ("retailer", "retailerName", "retailer_name", "name", "sellerName", "seller_name", "seller")
+DOMAIN_KEYS = ("domain", "retailerDomain", "retailer_domain", "website", "siteUrl", "site_url")
+# Only buy / redirect links: "url", "logo", "storeUrl", ... point at images
+# and retailer home pages.
+LINK_KEYS = ("buyUrl", "buy_url", "redirectUrl", "redirect_url", "clickUrl", "click_url")
+
+
+# ---------------------------------------------------------
+# PAYLOAD PARSING
+# ---------------------------------------------------------
+def _host_in(host, domains):
+    host = (host or "").lower()
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+def _is_amazon_url(url):
+    """amazon.com itself, or a WTB redirect whose target is amazon.com."""
+    parsed = urlparse(url)
+    if _host_in(parsed.hostname, AMAZON_DOMAINS):
+        return True
+    if not _host_in(parsed.hostname, WTB_RESPONSE_HOSTS):
+        return False
+    # redir.pricespider.com/...?url=https%3A%2F%2Fwww.amazon.com%2F... or ?asin=...
+    for key, values in parse_qs(parsed.query).items():
+        for val in values:
+            if key.lower() == "asin" or (val.startswith("http") and _is_amazon_url(val)):
+                return True
+    return False
+
+
+def _link_of(entry):
+    for key in LINK_KEYS:
+        val = entry.get(key)
+        if isinstance(val, str) and val.startswith("http") and _is_amazon_url(val):
+            return val
+    return None
+
+
+def _is_amazon(entry):
+    for key in NAME_KEYS:
+        val = entry.get(key)
+        if isinstance(val, str) and val.strip().lower() in AMAZON_NAMES:
+            return True
+    for key in DOMAIN_KEYS:
+        val = entry.get(key)
+        if isinstance(val, str) and _host_in(urlparse(val if "//" in val else "//" + val).hostname, AMAZON_DOMAINS):
+            return True
+    return False
+
+
+def find_amazon_link(payload):
+    """
+    Walk a WTB JSON payload and return the first Amazon retailer's
+    buy/redirect link, or None. The widget nests retailers differently
+    per endpoint, so any dict named Amazon (or on amazon.com) with a
+    buy/redirect link that leads to amazon.com counts.
+    """
+    stack = [payload]
+    while stack:
+        node = stack.pop(0)
+        if isinstance(node, dict):
+            if _is_amazon(node):
+                link = _link_of(node)
+                if link:
+                    return link
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return None
+
+
+# ---------------------------------------------------------
+# RESPONSE LISTENER
+# ---------------------------------------------------------
+class WtbCapture:
+    """
+    Listens to page responses from the WTB backend and keeps the first
+    Amazon retailer link seen in a JSON payload.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.amazon_link = None
+        self.payloads = 0
+        self._found = asyncio.Event()
+        page.on("response", self._on_response)
+
+    async def _on_response(self, response):
+        if self.amazon_link or not is_wtb_response(response):
+            return
+        if "json" not in (response.headers.get("content-type") or ""):
+            return
+        try:
+            payload = json.loads(await response.text())
+        except Exception:
+            return
+
+        self.payloads += 1
+        link = find_amazon_link(payload)
+        if link and not self.amazon_link:
+            self.amazon_link = link
+            self._found.set()
+
+    async def wait(self, timeout_ms=PAYLOAD_TIMEOUT_MS):
+        """Return the captured Amazon link, waiting up to timeout_ms for it."""
+        if self.amazon_link:
+            return self.amazon_link
+        try:
+            await asyncio.wait_for(self._found.wait(), timeout_ms / 1000)
+        except asyncio.TimeoutError:
+            pass
+        return self.amazon_link
+
+    def detach(self):
+        self.page.remove_listener("response", self._on_response)
@@ -0,0 +1,108 @@
+import json
+import os
+from collections import defaultdict
+from urllib.parse import urlparse
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+CACHE_FILE = "zip_stats.json"
+
+# === ZIP CODES to test (All regions) ===
+ZIP_CODES = [
+    "60601", "48201",
+    "10001", "02139",
+    "75201", "33101",
+    "90001", "98101",
+    "80202", "84101"
+]
+
+CATEGORY_WIDE = "*"
+
+
+def url_prefix(product_url):
+    """/products/<line>/<slug> → /products/<line> (the product line)."""
+    parts = [p for p in urlparse(product_url or "").path.split("/") if p]
+    return "/" + "/".join(parts[:-1]) if len(parts) > 1 else "/"
+
+
+def _hit_rate(row):
+    # Laplace-smoothed so an untried ZIP sits at 0.5, between proven and dead ones
+    hits, misses = row.get("hits", 0), row.get("misses", 0)
+    return (hits + 1) / (hits + misses + 2)
+
+
+class ZipCache:
+    """
+    On-disk ZIP success table keyed by "<category>|<url prefix>" (plus a
+    "<category>|*" roll-up). `order()` puts the historically best ZIPs
+    first; `record()` updates the table and the run's hit/miss counters.
+    """
+
+    def __init__(self, path=CACHE_FILE, zip_codes=ZIP_CODES):
+        self.path = path
+        self.zip_codes = list(zip_codes)
+        self.table = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.table = json.load(f)
+
+        # counters for this run
+        self.hits = 0
+        self.misses = 0
+        self.products = 0
+        self.attempts = defaultdict(int)
+        self.first_try_hits = 0
+
+    @staticmethod
+    def _keys(category, product_url):
+        category = category or "Unknown"
+        return f"{category}|{url_prefix(product_url)}", f"{category}|{CATEGORY_WIDE}"
+
+    def order(self, category, product_url):
+        exact, wide = self._keys(category, product_url)
+        exact_rows = self.table.get(exact, {})
+        wide_rows = self.table.get(wide, {})
+
+        def score(z):
+            return (
+                _hit_rate(exact_rows.get(z, {})),
+                _hit_rate(wide_rows.get(z, {})),
+                -self.zip_codes.index(z),
+            )
+
+        return sorted(self.zip_codes, key=score, reverse=True)
+
+    def record(self, category, product_url, zipcode, hit):
+        for key in self._keys(category, product_url):
+            row = self.table.setdefault(key, {}).setdefault(zipcode, {"hits": 0, "misses": 0})
+            row["hits" if hit else "misses"] += 1
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self.attempts[product_url] += 1
+        if hit and self.attempts[product_url] == 1:
+            self.first_try_hits += 1
+
+    def finish_product(self, product_url):
+        self.products += 1
+        self.attempts.setdefault(product_url, 0)
+
+    def summary(self):
+        tried = sum(self.attempts.values())
+        return {
+            "zip_hits": self.hits,
+            "zip_misses": self.misses,
+            "products": self.products,
+            "first_try_hits": self.first_try_hits,
+            "avg_zip_attempts": round(tried / self.products, 2) if self.products else 0.0,
+        }
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.table, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)